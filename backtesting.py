@@ -0,0 +1,186 @@
+import os
+import random
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from checker import numbers_mask, prize_matches
+from draw_store import load_columns
+from frequency_index import count_numbers, rank_numbers
+from generation import generate_lines
+from odds import division_table
+
+# Walk-forward Monte Carlo backtesting of the line generation strategies.
+#
+# Each run replays the most recent draws oldest to newest. Before every draw
+# the numbers are ranked by how often they came up in the draws before it,
+# lines are generated from that ranking and scored against the real result.
+# The counts are carried forward by adding each draw after it is scored, so
+# a run costs O(new draw) per step rather than a recount of the history.
+# Runs (one per strategy and seed) are spread over a process pool.
+
+STRATEGIES = ("deterministic", "weighted")
+
+_state = None  # (game, draws, starting counts) in pool workers
+
+
+def load_draw_rows(game):
+    """Draws oldest first as (main numbers, supp numbers) tuples; supp is () when incomplete."""
+    columns = load_columns(game["file"], game["main_count"], game["supp_count"])
+    rows = []
+    for i in range(len(columns) - 1, -1, -1):
+        supp = tuple(columns.supp_row(i))
+        rows.append((tuple(columns.main_row(i)), () if 0 in supp else supp))
+    return rows
+
+
+def _count_draws(rows):
+    # (main entries, supp entries, draws counted) in frequency_index.count_numbers form
+    main_counts = {}
+    supp_counts = {}
+    for seq, (main, supp) in enumerate(rows, start=1):
+        count_numbers(main_counts, main, seq)
+        count_numbers(supp_counts, supp, seq)
+    return main_counts, supp_counts, len(rows)
+
+
+def _ranked(counts):
+    # Numbers seen so far in the order live generation ranks them (see frequency_index.rank_numbers)
+    ranked = rank_numbers(counts)
+    return [num for num, _ in ranked], [freq for _, freq in ranked]
+
+
+def _score(game, lines, main, supp):
+    win_main = numbers_mask(main)
+    win_supp = numbers_mask(supp)
+    summary = Counter()
+    for line_main, line_supp in lines:
+        summary[prize_matches(game, numbers_mask(line_main), numbers_mask(line_supp), win_main, win_supp)] += 1
+    return summary
+
+
+def _winnings(game, lines, main, supp, amounts, divisions):
+    # Prize money won by 'lines' in a draw paying 'amounts' (per division, division 1 first);
+    # 'divisions' is odds.division_table(game)
+    width, table = divisions
+    win_main = numbers_mask(main)
+    win_supp = numbers_mask(supp)
+    total = 0.0
+    for line_main, line_supp in lines:
+        main_matches, supp_matches = prize_matches(game, numbers_mask(line_main), numbers_mask(line_supp),
+                                                   win_main, win_supp)
+        division = table[main_matches * width + supp_matches]
+        if division and division <= len(amounts):
+            total += amounts[division - 1]
+    return total
+
+
+def walk_forward(game, rows, start_counts, strategy, seed, lines_per_draw, payouts=None):
+    """
+    One backtest run over 'rows' (the tested draws, oldest first).
+
+    - start_counts: (main entries, supp entries, draws) over the draws before the
+      first tested one, as counted by frequency_index.count_numbers.
+    - strategy: "deterministic" or "weighted".
+    - payouts: Optional per-row division amounts (division 1 first) to total the prize money won.
+    Returns (summary Counter keyed by (main_matches, supp_matches), draws scored, winnings).
+    """
+    main_count = game["main_count"]
+    supp_count = game["supp_count"]
+    main_counts = {num: list(entry) for num, entry in start_counts[0].items()}
+    supp_counts = {num: list(entry) for num, entry in start_counts[1].items()}
+    seq = start_counts[2]
+    rng = random.Random(seed)
+    deterministic = strategy == "deterministic"
+
+    divisions = division_table(game) if payouts is not None else None
+    summary = Counter()
+    draws_scored = 0
+    winnings = 0.0
+    for t, (main, supp) in enumerate(rows):
+        main_sorted, main_weights = _ranked(main_counts)
+        supp_sorted, supp_weights = _ranked(supp_counts)
+        enough = (len(main_sorted) >= main_count * (lines_per_draw if deterministic else 1)
+                  and (supp_count == 0
+                       or len(supp_sorted) >= supp_count * (lines_per_draw if deterministic else 1)))
+        if enough:
+            lines = generate_lines(main_count, supp_count, main_sorted, supp_sorted,
+                                   lines_per_draw, main_weights, supp_weights,
+                                   deterministic=deterministic, seed=rng.getrandbits(64))
+            summary.update(_score(game, lines, main, supp))
+            draws_scored += 1
+            if payouts is not None:
+                winnings += _winnings(game, lines, main, supp, payouts[t], divisions)
+        # This draw is now history for the next one
+        seq += 1
+        count_numbers(main_counts, main, seq)
+        count_numbers(supp_counts, supp, seq)
+    return summary, draws_scored, winnings
+
+
+def _init_worker(state):
+    global _state
+    _state = state
+
+
+def _run_task(task):
+    game, rows, start_counts, payouts = _state
+    strategy, seed, lines_per_draw = task
+    return walk_forward(game, rows, start_counts, strategy, seed, lines_per_draw, payouts)
+
+
+def run_backtest(game, strategies=STRATEGIES, seeds=10, test_draws=100, lines_per_draw=5,
+                 workers=None, base_seed=None, payouts=None):
+    """
+    Backtest generation strategies over the most recent 'test_draws' draws.
+
+    - strategies: Strategy names to run (see STRATEGIES).
+    - seeds: Random runs per strategy (deterministic selection only needs one).
+    - lines_per_draw: Lines generated for every tested draw.
+    - workers: Processes to use (default: one per core); 1 runs in this process.
+    - base_seed: Makes the whole backtest reproducible.
+    - payouts: Optional division amounts for every draw, oldest first and
+      aligned with load_draw_rows (see prizes.PrizeHistory.payouts); adds
+      the prize money the lines would have won.
+
+    Returns {strategy: {"runs", "draws", "lines", "summary", "mean_main_matches", "winnings"}}
+    where "summary" is a Counter of lines keyed by (main_matches, supp_matches)
+    over all runs, "mean_main_matches" holds each run's average per line and
+    "winnings" is the prize money won over all runs (0 without payouts).
+    """
+    all_rows = load_draw_rows(game)
+    test_draws = max(0, min(test_draws, len(all_rows) - 1))
+    start = len(all_rows) - test_draws
+    state = (game, all_rows[start:], _count_draws(all_rows[:start]),
+             payouts[start:] if payouts is not None else None)
+
+    rng = random.Random(base_seed)
+    tasks = []
+    for strategy in strategies:
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown strategy '{strategy}'.")
+        runs = 1 if strategy == "deterministic" else seeds
+        tasks.extend((strategy, rng.getrandbits(64), lines_per_draw) for _ in range(runs))
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers == 1 or len(tasks) <= 1:
+        _init_worker(state)
+        outcomes = list(map(_run_task, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(state,)) as pool:
+            outcomes = list(pool.map(_run_task, tasks))
+
+    results = {}
+    for (strategy, _, _), (summary, draws_scored, winnings) in zip(tasks, outcomes):
+        result = results.setdefault(strategy, {"runs": 0, "draws": draws_scored, "lines": 0,
+                                               "summary": Counter(), "mean_main_matches": [],
+                                               "winnings": 0.0})
+        lines = sum(summary.values())
+        result["runs"] += 1
+        result["lines"] += lines
+        result["winnings"] += winnings
+        result["summary"].update(summary)
+        if lines:
+            result["mean_main_matches"].append(sum(m * n for (m, _), n in summary.items()) / lines)
+    return results
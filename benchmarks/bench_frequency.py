@@ -0,0 +1,73 @@
+"""
+Compare the Counter-based frequency code with the bit-packed DrawIncidence engine.
+
+Run from the repository root:
+    python benchmarks/bench_frequency.py
+"""
+import os
+import sys
+import timeit
+from collections import Counter
+from itertools import combinations
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from frequency import DrawIncidence
+from lotto import load_historical_data
+
+GAMES = [
+    ("saturday-lotto.csv", 6, 2),
+    ("oz-lotto.csv", 7, 3),
+    ("powerball.csv", 7, 1),
+    ("set-for-life.csv", 7, 2),
+]
+
+
+def counter_frequencies(numbers, per_draw, window=None):
+    if window is not None:
+        numbers = numbers[:window * per_draw]
+    return Counter(numbers).most_common()
+
+
+def counter_pairs(numbers, per_draw):
+    pairs = Counter()
+    for i in range(0, len(numbers), per_draw):
+        pairs.update(combinations(sorted(numbers[i:i + per_draw]), 2))
+    return pairs
+
+
+def counter_gaps(numbers, per_draw):
+    gaps = {}
+    for i in range(0, len(numbers), per_draw):
+        for ball in numbers[i:i + per_draw]:
+            gaps.setdefault(ball, i // per_draw)
+    return gaps
+
+
+def bench(label, func, number):
+    seconds = min(timeit.repeat(func, number=number, repeat=5)) / number
+    print(f"  {label:<38} {seconds * 1e3:9.3f} ms")
+
+
+def main():
+    for filename, main_count, supp_count in GAMES:
+        main_numbers, _ = load_historical_data(filename, main_count, supp_count)
+        engine = DrawIncidence(main_numbers, main_count)
+        assert counter_frequencies(main_numbers, main_count) == engine.most_common()
+        assert dict(counter_pairs(main_numbers, main_count)) == engine.pair_counts()
+        assert counter_gaps(main_numbers, main_count) == engine.gaps()
+
+        print(f"{filename} ({engine.num_draws} draws)")
+        bench("Counter: frequencies", lambda: counter_frequencies(main_numbers, main_count), 50)
+        bench("Counter: last 100 draws", lambda: counter_frequencies(main_numbers, main_count, 100), 50)
+        bench("Counter: pair co-occurrence", lambda: counter_pairs(main_numbers, main_count), 5)
+        bench("Counter: gaps", lambda: counter_gaps(main_numbers, main_count), 50)
+        bench("DrawIncidence: build", lambda: DrawIncidence(main_numbers, main_count), 20)
+        bench("DrawIncidence: frequencies", lambda: engine.most_common(), 50)
+        bench("DrawIncidence: last 100 draws", lambda: engine.most_common(100), 50)
+        bench("DrawIncidence: pair co-occurrence", lambda: engine.pair_counts(), 5)
+        bench("DrawIncidence: gaps", lambda: engine.gaps(), 50)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Benchmark the loading, sampling, generation and checking hot paths on synthetic data.
+
+Run from the repository root:
+    python benchmarks/bench_hot_paths.py
+    python benchmarks/bench_hot_paths.py --game oz-lotto --draws 5000 --lines 1000 1000000 --stages check
+    python benchmarks/bench_hot_paths.py --lines 10000000 --stages check --ticket-format tix
+
+A random draw history of --draws draws and, for every --lines size, a random
+ticket file are written to a temporary directory, so results don't depend on
+the real CSVs and can be reproduced with --seed. Each stage is timed --repeat
+times; the report gives throughput (items per second at the median time),
+latency percentiles over the repeats (over single calls for "sample") and
+the peak memory traced by tracemalloc during one extra, untimed run.
+Generation keeps every line in memory, so leave it out (--stages) for the
+largest sizes. Add --profile-dir to also get cProfile dumps of every stage
+(see instrumentation.py).
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import instrumentation
+from checker import check_lines_file
+from draw_store import cache_path
+from frequency_index import FrequencyIndex
+from generation import generate_lines, weighted_sample_without_replacement
+from line_codec import GameCodec, write_ticket_ranks
+from lotto import find_game, frequency_pools, load_historical_data, write_lines_csv
+
+STAGES = ("load", "sample", "generate", "check")
+
+
+def write_history(filename, game, draws, rng):
+    """A results CSV of 'draws' uniformly random draws, newest first."""
+    main_balls = range(1, game["main_balls"] + 1)
+    supp_balls = range(1, (game["supp_balls"] or game["main_balls"]) + 1)
+    header = ["Draw number", "Draw date"]
+    header += [f"Winning Number {i}" for i in range(1, game["main_count"] + 1)]
+    header += [f"Supplementary Number {i}" for i in range(1, game["supp_count"] + 1)]
+    day = date(2024, 12, 31)
+    with open(filename, "w", encoding="utf-8") as f:
+        f.write(",".join(header) + "\n")
+        for draw_number in range(draws, 0, -1):
+            if game["supp_balls"] is None:
+                numbers = rng.sample(main_balls, game["main_count"] + game["supp_count"])
+            else:
+                numbers = rng.sample(main_balls, game["main_count"]) + rng.sample(supp_balls, game["supp_count"])
+            f.write(f"{draw_number},{day:%d/%m/%Y}," + ",".join(map(str, numbers)) + "\n")
+            day -= timedelta(days=7)
+
+
+def write_tickets(filename, game, lines, seed, ticket_format):
+    """A file of 'lines' uniformly random ticket lines (repeats allowed)."""
+    codec = GameCodec(game)
+    if ticket_format == "tix":
+        write_ticket_ranks(filename, game, codec.random_ranks(lines, seed, unique=False))
+        return
+    rng = random.Random(seed)
+    decode = codec.decode
+    write_lines_csv((decode(rng.randrange(codec.total)) for _ in range(lines)), game, filename)
+
+
+def _percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, round(q * (len(ordered) - 1)))]
+
+
+def measure(label, size, func, repeat, per_call=None):
+    """
+    Time 'func' 'repeat' times (after one warm-up call) and trace its peak memory once.
+
+    - size: Items 'func' handles per call, for the throughput.
+    - per_call: Optional list to collect single-item latencies in instead
+      (used when 'func' itself runs many small calls).
+    """
+    func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    latencies = sorted(per_call if per_call else timings)
+    median = sorted(timings)[len(timings) // 2]
+    return {"stage": label, "size": size, "runs": repeat,
+            "throughput": size / median if median else None,
+            "p50_ms": _percentile(latencies, 0.5) * 1e3, "p90_ms": _percentile(latencies, 0.9) * 1e3,
+            "p99_ms": _percentile(latencies, 0.99) * 1e3, "max_ms": latencies[-1] * 1e3,
+            "peak_mib": peak / (1 << 20)}
+
+
+def run(game, draws, sizes, samples, stages, repeat, seed, ticket_format, workdir):
+    rng = random.Random(seed)
+    game = dict(game, file=os.path.join(workdir, os.path.basename(game["file"])))
+    write_history(game["file"], game, draws, rng)
+    main_count, supp_count = game["main_count"], game["supp_count"]
+    results = []
+
+    if "load" in stages:
+        def cold_load():
+            cached = cache_path(game["file"], main_count, supp_count)
+            if os.path.exists(cached):
+                os.remove(cached)
+            load_historical_data(game["file"], main_count, supp_count)
+
+        results.append(measure("load (parse CSV)", draws, cold_load, repeat))
+        results.append(measure("load (cached)", draws,
+                               lambda: load_historical_data(game["file"], main_count, supp_count), repeat))
+
+    index = FrequencyIndex.open(game)
+    report = {"main": index.most_common("main"), "supp": index.most_common("supp") if index.supp_draws else []}
+    main_sorted, main_weights, supp_sorted, supp_weights = frequency_pools(report)
+
+    if "sample" in stages:
+        latencies = []
+
+        def sample_many():
+            latencies.clear()
+            clock = time.perf_counter
+            for i in range(samples):
+                start = clock()
+                weighted_sample_without_replacement(main_sorted, main_weights, main_count, i)
+                latencies.append(clock() - start)
+
+        results.append(measure("sample", samples, sample_many, repeat, latencies))
+
+    for size in sizes:
+        if "generate" in stages:
+            results.append(measure("generate", size, lambda: generate_lines(
+                main_count, supp_count, main_sorted, supp_sorted, size, main_weights, supp_weights,
+                seed=seed), repeat))
+        if "check" in stages:
+            tickets = os.path.join(workdir, f"tickets-{size}.{ticket_format}")
+            write_tickets(tickets, game, size, rng.getrandbits(64), ticket_format)
+            winning = rng.sample(range(1, game["main_balls"] + 1), main_count)
+            winning_supp = rng.sample(range(1, (game["supp_balls"] or game["main_balls"]) + 1), supp_count)
+            results.append(measure(f"check ({ticket_format})", size,
+                                   lambda: check_lines_file(tickets, game, winning, winning_supp), repeat))
+            os.remove(tickets)
+    return results
+
+
+def print_results(results):
+    print(f"{'stage':<18} {'size':>10} {'items/s':>12} {'p50 ms':>10} {'p90 ms':>10} "
+          f"{'p99 ms':>10} {'max ms':>10} {'peak MiB':>9}")
+    for r in results:
+        throughput = f"{r['throughput']:12,.0f}" if r["throughput"] else f"{'-':>12}"
+        print(f"{r['stage']:<18} {r['size']:>10} {throughput} {r['p50_ms']:10.3f} {r['p90_ms']:10.3f} "
+              f"{r['p99_ms']:10.3f} {r['max_ms']:10.3f} {r['peak_mib']:9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the hot paths on synthetic histories and tickets.")
+    parser.add_argument("--game", default="saturday-lotto", help="Game whose layout to simulate (default saturday-lotto)")
+    parser.add_argument("--draws", type=int, default=2000, help="Draws in the synthetic history (default 2000)")
+    parser.add_argument("--lines", type=int, nargs="+", default=[1000, 100_000],
+                        help="Ticket / generation sizes in lines (default 1000 100000)")
+    parser.add_argument("--samples", type=int, default=10_000,
+                        help="Weighted samples timed one by one (default 10000)")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES), help="Stages to run")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per stage (default 5)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic data (default 0)")
+    parser.add_argument("--ticket-format", choices=("csv", "tix"), default="csv",
+                        help="Ticket file format to check (default csv)")
+    parser.add_argument("--profile-dir", metavar="DIR", help="Also write cProfile dumps of every stage to DIR")
+    parser.add_argument("--json", action="store_true", help="Print JSON instead of a table")
+    args = parser.parse_args()
+
+    game = find_game(args.game)
+    if game is None:
+        parser.error(f"unknown game '{args.game}'")
+    if args.profile_dir:
+        instrumentation.enable(args.profile_dir)
+    with tempfile.TemporaryDirectory() as workdir:
+        results = run(game, args.draws, args.lines, args.samples, args.stages, args.repeat, args.seed,
+                      args.ticket_format, workdir)
+    if args.json:
+        print(json.dumps({"game": game["name"], "draws": args.draws, "results": results}))
+    else:
+        print(f"{game['name']} layout, {args.draws} synthetic draws")
+        print_results(results)
+
+
+if __name__ == "__main__":
+    main()
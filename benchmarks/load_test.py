@@ -0,0 +1,162 @@
+"""
+Load test for the results server (python lotto.py serve).
+
+Start the server, then run from the repository root:
+    python benchmarks/load_test.py --connections 50 --requests 5000
+    python benchmarks/load_test.py --spawn --mix check --check-lines 20000
+
+Each connection is kept alive and sends its share of the requests one after
+another, picking endpoints round-robin from --mix. The report gives requests
+per second and latency percentiles per endpoint. --spawn starts a server on
+--port for the duration of the test.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from lotto import GAMES
+
+ENDPOINTS = ("frequency", "pairs", "generate", "check", "history")
+
+
+def build_request(endpoint, rng, check_lines):
+    """(method, path, body) of one random request to 'endpoint'."""
+    game = rng.choice(sorted(GAMES))
+    rules = GAMES[game]
+    main_balls = rules["main_balls"]
+    supp_balls = rules["supp_balls"] or main_balls
+    if endpoint == "frequency":
+        return "GET", f"/frequency?game={game}&window={rng.randint(10, 200)}", None
+    if endpoint == "pairs":
+        return "GET", f"/pairs?game={game}&top=10&with={rng.randint(1, main_balls)}", None
+    if endpoint == "generate":
+        return "POST", "/generate", {"game": game, "lines": 10, "seed": rng.getrandbits(32)}
+
+    def line():
+        return {"main": rng.sample(range(1, main_balls + 1), rules["main_count"]),
+                "supp": rng.sample(range(1, supp_balls + 1), rules["user_supp_count"])}
+
+    lines = [line() for _ in range(check_lines if endpoint == "check" else 10)]
+    if endpoint == "history":
+        return "POST", "/check", {"game": game, "lines": lines, "history": True}
+    # Winning supplementaries from the main barrel can't repeat a winning main number
+    main_count, supp_count = rules["main_count"], rules["supp_count"]
+    if rules["supp_balls"] is None:
+        drawn = rng.sample(range(1, main_balls + 1), main_count + supp_count)
+        winning_main, winning_supp = drawn[:main_count], drawn[main_count:]
+    else:
+        winning_main = rng.sample(range(1, main_balls + 1), main_count)
+        winning_supp = rng.sample(range(1, supp_balls + 1), supp_count)
+    return "POST", "/check", {"game": game, "lines": lines, "main": winning_main, "supp": winning_supp}
+
+
+async def send(reader, writer, host, method, path, body):
+    data = json.dumps(body).encode("utf-8") if body is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Length: {len(data)}\r\n\r\n".encode("latin-1")
+                 + data)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def connection(host, port, requests, mix, seed, check_lines, results):
+    rng = random.Random(seed)
+    prepared = [(endpoint, build_request(endpoint, rng, check_lines))
+                for endpoint in (mix[i % len(mix)] for i in range(requests))]
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for endpoint, (method, path, body) in prepared:
+            start = time.perf_counter()
+            status = await send(reader, writer, host, method, path, body)
+            results.append((endpoint, status, time.perf_counter() - start))
+    finally:
+        writer.close()
+
+
+def _percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, round(q * (len(ordered) - 1)))]
+
+
+async def run(args):
+    results = []
+    share, extra = divmod(args.requests, args.connections)
+    start = time.perf_counter()
+    await asyncio.gather(*(connection(args.host, args.port, share + (i < extra), args.mix, args.seed + i,
+                                      args.check_lines, results)
+                           for i in range(args.connections)))
+    elapsed = time.perf_counter() - start
+
+    print(f"{len(results)} requests over {args.connections} connection(s) in {elapsed:.2f} s: "
+          f"{len(results) / elapsed:,.0f} requests/s")
+    print(f"{'endpoint':<10} {'requests':>8} {'errors':>7} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for endpoint in args.mix:
+        latencies = sorted(t for e, _, t in results if e == endpoint)
+        if not latencies:
+            continue
+        errors = sum(1 for e, status, _ in results if e == endpoint and status != 200)
+        print(f"{endpoint:<10} {len(latencies):>8} {errors:>7} "
+              + " ".join(f"{_percentile(latencies, q) * 1e3:9.2f}" for q in (0.5, 0.9, 0.99, 1.0)))
+
+
+async def wait_for_server(host, port, timeout=60):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.2)
+            continue
+        writer.close()
+        return
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the results server.")
+    parser.add_argument("--host", default="127.0.0.1", help="Server address (default 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8000, help="Server port (default 8000)")
+    parser.add_argument("--connections", type=int, default=20, help="Concurrent connections (default 20)")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests in total (default 2000)")
+    parser.add_argument("--mix", nargs="+", choices=ENDPOINTS, default=["frequency", "pairs", "generate", "check"],
+                        help="Endpoints to call, round-robin (default frequency pairs generate check)")
+    parser.add_argument("--check-lines", type=int, default=100, help="Lines per check request (default 100)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the generated requests (default 0)")
+    parser.add_argument("--spawn", action="store_true", help="Start a server on --port for the test")
+    args = parser.parse_args()
+    args.connections = max(1, min(args.connections, args.requests))
+
+    server = None
+    if args.spawn:
+        server = subprocess.Popen([sys.executable, os.path.join(ROOT, "lotto.py"), "serve",
+                                   "--host", args.host, "--port", str(args.port)], cwd=ROOT)
+    try:
+        if server is not None:
+            asyncio.run(wait_for_server(args.host, args.port))
+        asyncio.run(run(args))
+    finally:
+        if server is not None:
+            server.send_signal(signal.SIGINT)  # Lets it shut its worker pool down
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+import csv
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from draw_store import load_columns
+from frequency import DrawIncidence
+import instrumentation
+from line_codec import GameCodec, is_ticket_file, iter_ticket_ranks
+
+# Bulk ticket checking on ball bitmasks.
+#
+# A line (or a draw) is encoded as an int with bit n set for every number n
+# it contains; every game's numbers fit in 64 bits. The number of matches
+# between a line and the winning numbers is then one AND plus a popcount.
+# Identical lines are grouped before matching, so a syndicate file with
+# repeated combinations only pays for each distinct line once.
+
+
+def numbers_mask(numbers):
+    """Bitmask with bit n set for each number n."""
+    mask = 0
+    for n in numbers:
+        mask |= 1 << n
+    return mask
+
+
+def validate_numbers(numbers, count, balls, label):
+    """Raise ValueError unless 'numbers' are 'count' distinct ints from 1 to 'balls'."""
+    if len(numbers) != count:
+        raise ValueError(f"Need {count} {label}, got {len(numbers)}.")
+    for n in numbers:
+        if not isinstance(n, int) or isinstance(n, bool):
+            raise ValueError(f"The {label} must be whole numbers.")
+        if not 1 <= n <= balls:
+            raise ValueError(f"The {label} must be from 1 to {balls} (got {n}).")
+    if len(set(numbers)) != count:
+        raise ValueError(f"The {label} must all be different.")
+
+
+def validate_line(game, main, supp=()):
+    """Raise ValueError unless (main, supp) is a valid line for the game."""
+    validate_numbers(main, game["main_count"], game["main_balls"], "main numbers")
+    validate_numbers(supp, game["user_supp_count"], game["supp_balls"] or game["main_balls"],
+                     "supplementary numbers")
+
+
+def validate_winning_numbers(game, main, supp=()):
+    """Raise ValueError unless (main, supp) could be the winning numbers of a draw of the game."""
+    validate_numbers(main, game["main_count"], game["main_balls"], "winning main numbers")
+    validate_numbers(supp, game["supp_count"], game["supp_balls"] or game["main_balls"],
+                     "winning supplementary numbers")
+    if game["supp_balls"] is None and set(main) & set(supp):
+        raise ValueError("The winning supplementary numbers come from the main barrel, "
+                         "so can't repeat a winning main number.")
+
+
+# Bit for each number as it is usually written, so parsing a line is a dict lookup per number
+_BALL_BITS = {str(n): 1 << n for n in range(64)}
+
+
+def _balls_mask(balls):
+    # Bits 1..balls: the numbers a barrel of 'balls' can hold
+    return (1 << (balls + 1)) - 2
+
+
+def _text_mask(text, count, allowed):
+    # Space-separated numbers as written in lines.csv -> bitmask, or None if
+    # invalid; 'allowed' is the _balls_mask of the barrel they come from
+    parts = text.split()
+    if len(parts) != count:
+        return None
+    try:
+        mask = sum(map(_BALL_BITS.__getitem__, parts))
+    except KeyError:
+        try:
+            numbers = [int(x) for x in parts]
+        except ValueError:
+            return None
+        if not all(0 <= n < 64 for n in numbers):
+            return None
+        mask = sum(1 << n for n in numbers)
+    # Repeated numbers carry into fewer set bits
+    if mask.bit_count() != count or mask & ~allowed:
+        return None
+    return mask
+
+
+def _ticket_file_masks(filename, game):
+    codec = GameCodec(game)
+    for chunk in iter_ticket_ranks(filename, game):
+        for main, supp in codec.decode_many(chunk):
+            yield numbers_mask(main), numbers_mask(supp)
+
+
+def iter_line_masks(filename, game, skipped=None):
+    """
+    Stream (main_mask, supp_mask) pairs from a lines.csv style file or a
+    packed ticket file (see line_codec).
+
+    Rows are read one at a time, so files larger than memory are fine. Rows
+    that don't have the right amount of distinct numbers from the game's
+    barrels are skipped silently; pass a Counter as 'skipped' to have them
+    counted under "rows".
+    """
+    if is_ticket_file(filename):
+        yield from _ticket_file_masks(filename, game)
+        return
+    main_count = game["main_count"]
+    supp_count = game["user_supp_count"]  # Number of supplementary numbers the user picks
+    expected_cols = 3 if supp_count > 0 else 2
+    main_allowed = _balls_mask(game["main_balls"])
+    supp_allowed = _balls_mask(game["supp_balls"] or game["main_balls"])
+
+    with open(filename, 'r', newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        for row in reader:
+            if len(row) < expected_cols:
+                if skipped is not None:
+                    skipped["rows"] += 1
+                continue
+            main_mask = _text_mask(row[1], main_count, main_allowed)
+            if main_mask is None:
+                # Header row or bad data
+                if skipped is not None and row[0].strip().lower() != "line #":
+                    skipped["rows"] += 1
+                continue
+            supp_mask = 0
+            if supp_count > 0:
+                supp_mask = _text_mask(row[2], supp_count, supp_allowed)
+                if supp_mask is None:
+                    if skipped is not None:
+                        skipped["rows"] += 1
+                    continue
+            yield main_mask, supp_mask
+
+
+@instrumentation.timed("match")
+def match_summary(game, line_masks, winning_main, winning_supp):
+    """
+    Tally (main_matches, supp_matches) over an iterable of (main_mask, supp_mask) pairs.
+
+    Matches are counted under the game's prize rules, as in prize_matches:
+    supplementaries drawn from the main barrel are matched against the
+    line's main numbers, a separate Powerball against the line's own pick.
+    """
+    win_main = numbers_mask(winning_main)
+    win_supp = numbers_mask(winning_supp)
+    supp_from_main = game["supp_balls"] is None
+
+    summary = Counter()
+    for (main_mask, supp_mask), count in Counter(line_masks).items():
+        main_matches = (main_mask & win_main).bit_count()
+        supp_matches = ((main_mask if supp_from_main else supp_mask) & win_supp).bit_count()
+        summary[(main_matches, supp_matches)] += count
+    return summary
+
+
+@instrumentation.timed("check")
+def check_lines_file(filename, game, winning_main, winning_supp, chunk_size=1_000_000):
+    """
+    Check every line of a lines.csv style file against one draw without printing per line.
+
+    The file is streamed in chunks of 'chunk_size' lines, so memory use is
+    bounded by the chunk size rather than the file size.
+    Returns (summary Counter keyed by (main_matches, supp_matches), lines checked, rows skipped).
+    """
+    skipped = Counter()
+    summary = Counter()
+    masks = iter_line_masks(filename, game, skipped)
+    while True:
+        chunk = list(islice(masks, chunk_size))
+        if not chunk:
+            break
+        summary.update(match_summary(game, chunk, winning_main, winning_supp))
+    instrumentation.count("lines_checked", sum(summary.values()))
+    return summary, sum(summary.values()), skipped["rows"]
+
+
+# Checking lines against the whole draw history.
+#
+# Rather than comparing every line with every draw, the history is kept as one
+# bitset per ball over the draws (see frequency.DrawIncidence). Adding up the
+# bitsets of a line's numbers with a bit-sliced counter gives that line's
+# match count for every draw at once, as a few bitplanes; the histogram is
+# then one AND/popcount per (main, supp) outcome. Blocks of lines are spread
+# over a process pool.
+
+_history = None  # (num_draws, main ball masks, supp ball masks, supp mode) in pool workers
+
+
+def mask_numbers(mask):
+    """Numbers whose bit is set in 'mask', ascending."""
+    numbers = []
+    while mask:
+        low = mask & -mask
+        numbers.append(low.bit_length() - 1)
+        mask ^= low
+    return numbers
+
+
+def load_history_masks(game):
+    """
+    Per-ball draw bitsets for a game's history.
+    Returns (num_draws, main ball masks, supp ball masks); draw i is bit i, most recent first.
+    """
+    columns = load_columns(game["file"], game["main_count"], game["supp_count"])
+    main_masks = DrawIncidence(columns.flat_main(), columns.main_count).masks
+    supp_masks = {}
+    if columns.supp_count > 0:
+        # Keep every draw (0 marks a missing supplementary) so bits line up with the main masks
+        supp_masks = DrawIncidence(columns.supp.tolist(), columns.supp_count).masks
+        supp_masks.pop(0, None)
+    return len(columns), main_masks, supp_masks
+
+
+def _bit_sliced_counts(numbers, ball_masks):
+    # Bitplanes of the per-draw count of 'numbers' present, least significant plane first
+    planes = []
+    for n in numbers:
+        carry = ball_masks.get(n, 0)
+        for i, plane in enumerate(planes):
+            if not carry:
+                break
+            planes[i] = plane ^ carry
+            carry &= plane
+        if carry:
+            planes.append(carry)
+    return planes
+
+
+def _value_masks(planes, all_draws):
+    # Draw mask for each count value that occurs
+    values = {0: all_draws}
+    for bit, plane in enumerate(planes):
+        nxt = {}
+        for value, mask in values.items():
+            if mask & plane:
+                nxt[value | (1 << bit)] = mask & plane
+            if mask & ~plane:
+                nxt[value] = mask & ~plane
+        values = nxt
+    return values
+
+
+def _line_history_histogram(main_mask, supp_mask, num_draws, main_balls, supp_balls, supp_mode):
+    all_draws = (1 << num_draws) - 1
+    main_values = _value_masks(_bit_sliced_counts(mask_numbers(main_mask), main_balls), all_draws)
+    if supp_mode == "line":
+        supp_planes = _bit_sliced_counts(mask_numbers(supp_mask), supp_balls)
+    elif supp_mode == "main":
+        supp_planes = _bit_sliced_counts(mask_numbers(main_mask), supp_balls)
+    else:
+        supp_planes = []
+    supp_values = _value_masks(supp_planes, all_draws)
+
+    histogram = Counter()
+    for m, m_draws in main_values.items():
+        for s, s_draws in supp_values.items():
+            count = (m_draws & s_draws).bit_count()
+            if count:
+                histogram[(m, s)] = count
+    return histogram
+
+
+def _init_history_worker(history):
+    global _history
+    _history = history
+
+
+def _history_block(block):
+    return [_line_history_histogram(main_mask, supp_mask, *_history) for main_mask, supp_mask in block]
+
+
+@instrumentation.timed("check_history")
+def check_lines_against_history(game, line_masks, workers=None, block_size=2000):
+    """
+    Match every line against every draw in the game's history.
+
+    - line_masks: List of (main_mask, supp_mask) pairs, e.g. from iter_line_masks.
+    - workers: Processes to use (default: one per core); 1 runs in this process.
+    - block_size: Lines handed to a worker at a time.
+
+    Returns (per-line histograms, overall histogram, number of draws). Each
+    histogram is a Counter of draws keyed by (main_matches, supp_matches),
+    with supplementary matches counted as in match_summary.
+    """
+    num_draws, main_balls, supp_balls = load_history_masks(game)
+    if game["supp_count"] == 0:
+        supp_mode = None
+    elif game["supp_balls"] is None:
+        supp_mode = "main"
+    else:
+        supp_mode = "line"
+    history = (num_draws, main_balls, supp_balls, supp_mode)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    blocks = [line_masks[i:i + block_size] for i in range(0, len(line_masks), block_size)]
+    if workers == 1 or len(blocks) <= 1:
+        _init_history_worker(history)
+        results = map(_history_block, blocks)
+        per_line = [hist for block in results for hist in block]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_history_worker,
+                                 initargs=(history,)) as pool:
+            per_line = [hist for block in pool.map(_history_block, blocks) for hist in block]
+
+    overall = Counter()
+    for histogram in per_line:
+        overall.update(histogram)
+    instrumentation.count("lines_checked", len(per_line))
+    return per_line, overall, num_draws
+
+
+# Prize divisions
+
+def prize_matches(game, main_mask, supp_mask, win_main, win_supp):
+    """
+    (main_matches, supp_matches) under the game's prize rules: supplementaries
+    drawn from the main barrel are matched against the line's main numbers,
+    a separate Powerball against the line's own pick.
+    """
+    main_matches = (main_mask & win_main).bit_count()
+    if game["supp_balls"] is None:
+        return main_matches, (main_mask & win_supp).bit_count()
+    return main_matches, (supp_mask & win_supp).bit_count()
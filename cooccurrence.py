@@ -0,0 +1,191 @@
+import array
+import heapq
+import os
+from functools import partial
+from itertools import combinations
+
+from draw_store import load_columns
+from frequency import DrawIncidence
+from frequency_index import FrequencyIndex
+
+# Pair and triple co-occurrence of a game's main numbers.
+#
+# Counts come from the per-ball draw bitsets of frequency.DrawIncidence: the
+# draws in which a and b were both drawn are mask[a] & mask[b], so a pair
+# count is one AND and a popcount, and "the last N draws" is the same with
+# the low N bits only. For each window asked about, the symmetric pair count
+# matrix (and, on demand, the sparse triple counts) is built once and kept,
+# so top-K and "drawn most often with n" queries only pick from precomputed
+# counts with a heap. Indexes are shared per game file for as long as the
+# file is unchanged.
+#
+# A game's index starts from the all-time and rolling-window pair counts
+# that frequency_index.FrequencyIndex keeps on disk, so the draw history is
+# only read (into a DrawIncidence) for other windows or for triples.
+
+_indexes = {}  # (csv path, main_count) -> ((mtime_ns, size), CooccurrenceIndex)
+
+
+def _load_incidence(game):
+    # The main number DrawIncidence of a game's whole history
+    columns = load_columns(game["file"], game["main_count"], game["supp_count"])
+    return DrawIncidence(columns.flat_main(), game["main_count"])
+
+
+class CooccurrenceIndex:
+    """
+    Co-occurrence counts of main numbers over a game's draw history.
+
+    - num_draws: Draws in the history.
+    - balls: Main numbers that have been drawn.
+    - load_incidence: Function returning the history's frequency.DrawIncidence,
+      called the first time counts that weren't added with add_counts are needed.
+    Use CooccurrenceIndex.for_game(game) to share one index per game, or
+    CooccurrenceIndex.from_numbers for a history already in memory.
+    """
+
+    def __init__(self, num_draws, balls, load_incidence=None):
+        self.num_draws = num_draws
+        self.balls = sorted(balls)
+        self.size = (self.balls[-1] + 1) if self.balls else 0
+        self._load_incidence = load_incidence
+        self._incidence = None
+        self._pairs = {}        # window -> flat size x size array of pair counts
+        self._triples = {}      # window -> {(a, b, c): count}
+        self._frequencies = {}  # window -> {ball: draws it was drawn in}
+
+    @classmethod
+    def from_numbers(cls, numbers, per_draw):
+        """
+        The index over a flat list of main numbers, per_draw per draw, most
+        recent draw first.
+        """
+        incidence = DrawIncidence(numbers, per_draw)
+        index = cls(incidence.num_draws, incidence.masks)
+        index._incidence = incidence
+        return index
+
+    @classmethod
+    def for_game(cls, game):
+        """The index for a game's main numbers, rebuilt only when its CSV changes."""
+        stat = os.stat(game["file"])
+        key = (os.path.abspath(game["file"]), game["main_count"])
+        cached = _indexes.get(key)
+        if cached is not None and cached[0] == (stat.st_mtime_ns, stat.st_size):
+            return cached[1]
+        counts = FrequencyIndex.open(game)
+        index = cls(counts.draws, counts.main, partial(_load_incidence, game))
+        index.add_counts(None, {ball: entry[0] for ball, entry in counts.main.items()}, counts.pair_counts())
+        if counts.window < counts.draws:
+            index.add_counts(counts.window, counts.window_main, counts.pair_counts(window=True))
+        _indexes[key] = ((stat.st_mtime_ns, stat.st_size), index)
+        return index
+
+    @property
+    def incidence(self):
+        """The history's frequency.DrawIncidence, loaded the first time it's needed."""
+        if self._incidence is None:
+            self._incidence = self._load_incidence()
+        return self._incidence
+
+    def add_counts(self, window, frequencies, pair_counts):
+        """
+        Use counts already known for the last 'window' draws (all if None):
+        'frequencies' {ball: draws} and 'pair_counts' {(a, b): draws with both}.
+        """
+        key = self._window_key(window)
+        size = self.size
+        matrix = array.array("I", bytes(4 * size * size))
+        for (a, b), count in pair_counts.items():
+            matrix[a * size + b] = matrix[b * size + a] = count
+        self._pairs[key] = matrix
+        self._frequencies[key] = dict(frequencies)
+
+    def _window_key(self, window):
+        return None if window is None or window >= self.num_draws else max(window, 0)
+
+    def frequencies(self, window=None):
+        """{ball: draws it was drawn in} over the last 'window' draws."""
+        key = self._window_key(window)
+        frequencies = self._frequencies.get(key)
+        if frequencies is None:
+            frequencies = self._frequencies[key] = self.incidence.frequencies(key)
+        return frequencies
+
+    def draws(self, window=None):
+        """Number of draws a query over 'window' counts."""
+        key = self._window_key(window)
+        return self.num_draws if key is None else key
+
+    def pair_matrix(self, window=None):
+        """
+        Symmetric pair counts over the last 'window' draws (all if None), as a
+        flat array: entry a * size + b is the number of draws with both a and b.
+        """
+        key = self._window_key(window)
+        matrix = self._pairs.get(key)
+        if matrix is None:
+            size = self.size
+            window_mask = self.incidence.window_mask(key)
+            masks = [(ball, self.incidence.masks[ball] & window_mask) for ball in self.balls]
+            matrix = array.array("I", bytes(4 * size * size))
+            for (a, mask_a), (b, mask_b) in combinations(masks, 2):
+                count = (mask_a & mask_b).bit_count()
+                matrix[a * size + b] = matrix[b * size + a] = count
+            self._pairs[key] = matrix
+        return matrix
+
+    def pair_count(self, a, b, window=None):
+        if not (0 <= a < self.size and 0 <= b < self.size) or a == b:
+            return 0
+        return self.pair_matrix(window)[a * self.size + b]
+
+    def triple_counts(self, window=None):
+        """{(a, b, c): draws with all three, a < b < c} over the last 'window' draws (non-zero only)."""
+        key = self._window_key(window)
+        counts = self._triples.get(key)
+        if counts is None:
+            counts = self._triples[key] = self.incidence.triple_counts(key)
+        return counts
+
+    def top_pairs(self, k=10, window=None):
+        """The k pairs drawn together most often, as ((a, b), count), ties by numbers."""
+        matrix = self.pair_matrix(window)
+        size = self.size
+        pairs = (((a, b), matrix[a * size + b]) for a, b in combinations(self.balls, 2))
+        return heapq.nlargest(k, pairs, key=lambda item: item[1])
+
+    def top_triples(self, k=10, window=None):
+        """The k triples drawn together most often, as ((a, b, c), count), ties by numbers."""
+        return heapq.nlargest(k, sorted(self.triple_counts(window).items()), key=lambda item: item[1])
+
+    def partners(self, number, k=10, window=None):
+        """The k numbers most often drawn together with 'number', as (number, count)."""
+        if not 0 <= number < self.size:
+            return []
+        matrix = self.pair_matrix(window)
+        row = number * self.size
+        others = ((ball, matrix[row + ball]) for ball in self.balls if ball != number)
+        return heapq.nlargest(k, others, key=lambda item: item[1])
+
+    def pair_lift(self, window=None):
+        """
+        Pair weights for generation.generate_lines: lift(a, b) = draws with
+        both a and b relative to freq(a) * freq(b) / draws, so pairs that come
+        up together more often than their own frequencies suggest score
+        higher. Returns a function lift(a, b).
+        """
+        matrix = self.pair_matrix(window)
+        frequencies = self.frequencies(window)
+        draws = self.draws(window)
+        size = self.size
+
+        def lift(a, b):
+            if not (0 <= a < size and 0 <= b < size):
+                return 1.0
+            expected = frequencies.get(a, 0) * frequencies.get(b, 0)
+            if not expected:
+                return 1.0
+            return matrix[a * size + b] * draws / expected
+
+        return lift
@@ -0,0 +1,201 @@
+import array
+import hashlib
+import mmap
+import os
+import struct
+
+import instrumentation
+from ingest import iter_game_draws
+
+# Compact columnar cache of a game's draw history.
+#
+# Layout (little-endian):
+#   header    - see HEADER_FORMAT below
+#   draw_no   - uint32 x num_draws
+#   draw_date - uint32 x num_draws (yyyymmdd, 0 if unknown)
+#   main      - uint8  x num_draws * main_count
+#   supp      - uint8  x num_draws * supp_count (0 = not drawn / unreadable)
+
+CACHE_DIR = ".lotto-cache"
+CACHE_MAGIC = b"LOTTOCOL"
+CACHE_VERSION = 2
+# magic, version, main_count, supp_count, num_draws, csv mtime_ns, csv size, csv sha1
+HEADER_FORMAT = "<8sHBBIqq20s4x"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+
+class DrawColumns:
+    """
+    Column view over a game's draw history.
+
+    - draw_number: uint32 column, one entry per draw.
+    - draw_date: uint32 column (yyyymmdd), one entry per draw.
+    - main: uint8 column, main_count entries per draw.
+    - supp: uint8 column, supp_count entries per draw (0 where missing).
+
+    When loaded from the cache the columns are memoryviews straight over the
+    mapped file, so nothing is copied until a caller asks for it.
+    """
+
+    def __init__(self, main_count, supp_count, draw_number, draw_date, main, supp):
+        self.main_count = main_count
+        self.supp_count = supp_count
+        self.draw_number = draw_number
+        self.draw_date = draw_date
+        self.main = main
+        self.supp = supp
+
+    def __len__(self):
+        return len(self.draw_number)
+
+    def main_row(self, i):
+        return self.main[i * self.main_count:(i + 1) * self.main_count]
+
+    def supp_row(self, i):
+        return self.supp[i * self.supp_count:(i + 1) * self.supp_count]
+
+    def flat_main(self):
+        """All main numbers as one flat list (draw order)."""
+        return self.main.tolist()
+
+    def flat_supp(self):
+        """All supplementary numbers of draws with a complete supp set, as one flat list."""
+        if self.supp_count == 0:
+            return []
+        supp = self.supp.tolist()
+        if 0 not in supp:
+            return supp
+        flat = []
+        for i in range(0, len(supp), self.supp_count):
+            row = supp[i:i + self.supp_count]
+            if 0 not in row:
+                flat.extend(row)
+        return flat
+
+
+def parse_csv_columns(filename, main_count, supp_count=0):
+    """
+    Parse a Lotterywest CSV into a DrawColumns backed by in-memory arrays.
+    Only draws with exactly main_count winning numbers are kept; supp numbers
+    are stored as 0 for draws without exactly supp_count of them.
+    """
+    draw_number = array.array("I")
+    draw_date = array.array("I")
+    main = array.array("B")
+    supp = array.array("B")
+
+    for draw in iter_game_draws(filename, main_count, supp_count):
+        day = draw.draw_date
+        draw_number.append(draw.draw_number)
+        draw_date.append(day.year * 10000 + day.month * 100 + day.day if day else 0)
+        main.extend(draw.main)
+        supp.extend(draw.supp or [0] * supp_count)
+
+    return DrawColumns(main_count, supp_count,
+                       memoryview(draw_number), memoryview(draw_date),
+                       memoryview(main), memoryview(supp))
+
+
+def _file_sha1(filename):
+    digest = hashlib.sha1()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            digest.update(block)
+    return digest.digest()
+
+
+def cache_file(filename, suffix):
+    """Path of a cache file derived from a game CSV, in CACHE_DIR next to the CSV."""
+    base = os.path.basename(filename)
+    directory = os.path.join(os.path.dirname(os.path.abspath(filename)), CACHE_DIR)
+    return os.path.join(directory, f"{base}.{suffix}")
+
+
+def cache_path(filename, main_count, supp_count):
+    return cache_file(filename, f"{main_count}x{supp_count}.bin")
+
+
+def _read_header(path):
+    try:
+        with open(path, 'rb') as f:
+            raw = f.read(HEADER_SIZE)
+    except OSError:
+        return None
+    if len(raw) != HEADER_SIZE:
+        return None
+    header = struct.unpack(HEADER_FORMAT, raw)
+    if header[0] != CACHE_MAGIC or header[1] != CACHE_VERSION:
+        return None
+    return header
+
+
+def _write_cache(path, columns, mtime_ns, size, sha1):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    header = struct.pack(HEADER_FORMAT, CACHE_MAGIC, CACHE_VERSION,
+                         columns.main_count, columns.supp_count, len(columns),
+                         mtime_ns, size, sha1)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        for column in (columns.draw_number, columns.draw_date, columns.main, columns.supp):
+            f.write(column)
+    os.replace(tmp_path, path)
+
+
+def _map_cache(path, main_count, supp_count, num_draws):
+    with open(path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+
+    offset = HEADER_SIZE
+    sizes = (num_draws * 4, num_draws * 4, num_draws * main_count, num_draws * supp_count)
+    if len(view) != offset + sum(sizes):
+        view.release()
+        mapped.close()
+        return None
+
+    columns = []
+    for size, fmt in zip(sizes, ("I", "I", "B", "B")):
+        columns.append(view[offset:offset + size].cast(fmt))
+        offset += size
+    return DrawColumns(main_count, supp_count, *columns)
+
+
+@instrumentation.timed("load")
+def load_columns(filename, main_count, supp_count=0):
+    """
+    Load a game's draw history as columns, going through the binary cache.
+
+    The cache is reused while the CSV's mtime and size are unchanged. If they
+    differ, the CSV is hashed: a matching hash only refreshes the cache header,
+    anything else rebuilds the cache from the CSV. If the cache can't be
+    written the parsed columns are returned directly.
+    """
+    stat = os.stat(filename)
+    path = cache_path(filename, main_count, supp_count)
+    header = _read_header(path)
+
+    if header is not None and header[2:4] == (main_count, supp_count):
+        num_draws, mtime_ns, size, sha1 = header[4:]
+        if (mtime_ns, size) != (stat.st_mtime_ns, stat.st_size):
+            if _file_sha1(filename) == sha1:
+                try:
+                    with open(path, 'r+b') as f:
+                        f.write(struct.pack(HEADER_FORMAT, CACHE_MAGIC, CACHE_VERSION,
+                                            main_count, supp_count, num_draws,
+                                            stat.st_mtime_ns, stat.st_size, sha1))
+                except OSError:
+                    pass
+            else:
+                header = None
+        if header is not None:
+            columns = _map_cache(path, main_count, supp_count, num_draws)
+            if columns is not None:
+                return columns
+
+    columns = parse_csv_columns(filename, main_count, supp_count)
+    try:
+        _write_cache(path, columns, stat.st_mtime_ns, stat.st_size, _file_sha1(filename))
+    except OSError as e:
+        print(f"Could not write draw cache {path}: {e}")
+    return columns
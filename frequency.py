@@ -0,0 +1,114 @@
+from itertools import combinations
+
+# Bit-packed draws x balls incidence matrix.
+#
+# Each ball gets one Python int used as a bitset over the draws: bit i is set
+# when the ball came up in draw i. Draw 0 is the first row of the CSV, which
+# is the most recent draw, so "the last N draws" is simply the low N bits.
+# Counting is then int.bit_count() on a mask (or on the AND of several masks
+# for co-occurrence), instead of a Python pass over every draw.
+
+
+def _trailing_zeros(mask):
+    return (mask & -mask).bit_length() - 1
+
+
+def _trailing_ones(mask):
+    return (mask ^ (mask + 1)).bit_length() - 1
+
+
+def _longest_run(mask):
+    # Each step shortens every run of 1s by one bit
+    length = 0
+    while mask:
+        mask &= mask >> 1
+        length += 1
+    return length
+
+
+class DrawIncidence:
+    """
+    Incidence matrix for one set of numbers (main or supplementary) of a game.
+
+    - numbers: Flat list of drawn numbers, per_draw entries per draw, most recent draw first
+      (the layout returned by load_historical_data).
+    - per_draw: How many numbers make up one draw.
+    """
+
+    def __init__(self, numbers, per_draw):
+        self.per_draw = per_draw
+        self.num_draws = len(numbers) // per_draw if per_draw else 0
+
+        # Column j holds the j-th number of every draw. For each ball, translate
+        # every column into b'0'/b'1' (1 where the ball is), OR the columns
+        # together and read the result as a binary literal, most recent draw last.
+        total = self.num_draws * per_draw
+        columns = [bytes(numbers[j:total:per_draw]) for j in range(per_draw)]
+        self.masks = {}
+        for ball in dict.fromkeys(numbers[:total]):  # Order of first appearance, like Counter
+            table = bytearray(b'0' * 256)
+            table[ball] = ord('1')
+            hits = 0
+            for column in columns:
+                hits |= int.from_bytes(column.translate(table), 'big')
+            self.masks[ball] = int(hits.to_bytes(self.num_draws, 'big')[::-1], 2)
+        self.all_draws = (1 << self.num_draws) - 1
+
+    def window_mask(self, window=None):
+        """Bitmask selecting the most recent 'window' draws (all draws if None)."""
+        if window is None or window >= self.num_draws:
+            return self.all_draws
+        return (1 << max(window, 0)) - 1
+
+    def frequencies(self, window=None):
+        """Number of draws each ball appeared in, optionally over the last 'window' draws."""
+        window_mask = self.window_mask(window)
+        return {ball: (mask & window_mask).bit_count() for ball, mask in self.masks.items()}
+
+    def most_common(self, window=None):
+        """(ball, count) pairs sorted by count, ties in order of first appearance."""
+        return sorted(self.frequencies(window).items(), key=lambda item: item[1], reverse=True)
+
+    def pair_counts(self, window=None):
+        """Number of draws in which each pair of balls appeared together."""
+        window_mask = self.window_mask(window)
+        masks = sorted((ball, mask & window_mask) for ball, mask in self.masks.items())
+        counts = {}
+        for (a, mask_a), (b, mask_b) in combinations(masks, 2):
+            count = (mask_a & mask_b).bit_count()
+            if count:
+                counts[(a, b)] = count
+        return counts
+
+    def triple_counts(self, window=None):
+        """Number of draws in which each triple of balls appeared together."""
+        window_mask = self.window_mask(window)
+        masks = sorted((ball, mask & window_mask) for ball, mask in self.masks.items())
+        counts = {}
+        for i, (a, mask_a) in enumerate(masks):
+            for j in range(i + 1, len(masks)):
+                b, mask_b = masks[j]
+                mask_ab = mask_a & mask_b
+                if not mask_ab:
+                    continue
+                for c, mask_c in masks[j + 1:]:
+                    count = (mask_ab & mask_c).bit_count()
+                    if count:
+                        counts[(a, b, c)] = count
+        return counts
+
+    def gaps(self):
+        """Draws since each ball last came up (0 = drawn in the most recent draw)."""
+        return {ball: _trailing_zeros(mask) for ball, mask in self.masks.items()}
+
+    def hot_streaks(self):
+        """Current run of consecutive draws each ball has appeared in (0 if it missed the last draw)."""
+        return {ball: _trailing_ones(mask) for ball, mask in self.masks.items()}
+
+    def longest_streaks(self):
+        """Longest run of consecutive draws each ball has appeared in."""
+        return {ball: _longest_run(mask) for ball, mask in self.masks.items()}
+
+    def longest_droughts(self):
+        """Longest run of consecutive draws each ball has been absent from."""
+        return {ball: _longest_run(~mask & self.all_draws) for ball, mask in self.masks.items()}
@@ -0,0 +1,235 @@
+import json
+import os
+from collections import deque
+from itertools import combinations
+
+from draw_store import cache_file
+from ingest import iter_game_draws
+
+# Persistent, incrementally updated frequency index for one game.
+#
+# The index keeps all-time and rolling-window counts for every number, plus
+# main number pair co-occurrence counts, and remembers the last draw it has
+# ingested. Lotterywest CSVs list the newest draw first, so after a new CSV
+# is downloaded only the rows above the last known draw are read; each new
+# draw is added in O(numbers^2) and the draw that falls out of the window is
+# subtracted again. An unchanged CSV (same mtime and size) isn't read at all.
+# If the CSV doesn't continue the history the index knows about, it is
+# rebuilt from scratch.
+#
+# frequency_report answers all-time and DEFAULT_WINDOW queries from the
+# index, and cooccurrence.CooccurrenceIndex.for_game starts from its pair
+# counts, so neither needs the whole history for those.
+
+INDEX_VERSION = 4
+DEFAULT_WINDOW = 100
+
+
+def count_numbers(entries, numbers, seq):
+    """
+    Count one draw's numbers into 'entries' (number -> [count, seq of its most
+    recent draw, position within that draw]); 'seq' numbers the draws oldest first.
+    """
+    for pos, num in enumerate(numbers):
+        entry = entries.setdefault(num, [0, 0, 0])
+        entry[0] += 1
+        entry[1:] = [seq, pos]
+
+
+def rank_numbers(entries):
+    """
+    (number, count) pairs from count_numbers entries, most common first.
+    Ties go to the number drawn most recently (earlier in that draw first),
+    the order Counter.most_common gives over the newest-first history.
+    """
+    ranked = sorted(entries.items(), key=lambda item: (-item[1][0], -item[1][1], item[1][2]))
+    return [(num, entry[0]) for num, entry in ranked]
+
+
+def _pair_key(pair):
+    return f"{pair[0]}-{pair[1]}"
+
+
+def _key_pair(key):
+    a, b = key.split("-")
+    return int(a), int(b)
+
+
+class FrequencyIndex:
+    """
+    Frequency and co-occurrence counts for a game, kept up to date from its CSV.
+
+    - game: Entry of the games table.
+    - window: Number of most recent draws in the rolling-window view.
+
+    Use FrequencyIndex.open(game) to load the saved index and ingest any new draws.
+    """
+
+    def __init__(self, game, window=DEFAULT_WINDOW):
+        self.game = game
+        self.window = window
+        self.path = cache_file(game["file"], f"{game['main_count']}x{game['supp_count']}.index.json")
+        self.reset()
+
+    def reset(self):
+        self.mtime_ns = None
+        self.size = None
+        self.last_draw = None   # (draw number, main numbers) of the newest ingested draw
+        self.seq = 0            # Draws ingested; also orders ties like Counter over newest-first data
+        self.draws = 0
+        self.supp_draws = 0
+        # number -> [count, seq of most recent appearance, position within that draw]
+        self.main = {}
+        self.supp = {}
+        self.pairs = {}
+        self.recent = deque()   # Last 'window' draws, oldest first, as (main, supp)
+        self.window_main = {}
+        self.window_supp = {}
+        self.window_pairs = {}
+
+    @classmethod
+    def open(cls, game, window=DEFAULT_WINDOW):
+        """Load the saved index (if any), ingest new draws from the CSV and save it if anything changed."""
+        index = cls(game, window)
+        index.load()
+        seen = (index.mtime_ns, index.size)
+        index.update()
+        if (index.mtime_ns, index.size) != seen:
+            try:
+                index.save()
+            except OSError as e:
+                print(f"Could not write frequency index {index.path}: {e}")
+        return index
+
+    # Ingesting draws
+
+    def add_draw(self, main, supp):
+        """Add one draw (newer than everything ingested so far)."""
+        self.seq += 1
+        self.draws += 1
+        count_numbers(self.main, main, self.seq)
+        if supp:
+            self.supp_draws += 1
+            count_numbers(self.supp, supp, self.seq)
+        pairs = list(combinations(sorted(main), 2))
+        for pair in pairs:
+            self.pairs[pair] = self.pairs.get(pair, 0) + 1
+
+        self.recent.append((list(main), list(supp)))
+        self._window_add(main, supp, pairs, 1)
+        while len(self.recent) > self.window:
+            old_main, old_supp = self.recent.popleft()
+            self._window_add(old_main, old_supp, combinations(sorted(old_main), 2), -1)
+
+    def _window_add(self, main, supp, pairs, delta):
+        for counts, numbers in ((self.window_main, main), (self.window_supp, supp)):
+            for num in numbers:
+                counts[num] = counts.get(num, 0) + delta
+                if not counts[num]:
+                    del counts[num]
+        for pair in pairs:
+            self.window_pairs[pair] = self.window_pairs.get(pair, 0) + delta
+            if not self.window_pairs[pair]:
+                del self.window_pairs[pair]
+
+    def _read_new_draws(self):
+        # Draws above the last ingested one (newest first), and whether the CSV continues the known history
+        new_draws = []
+        for draw in iter_game_draws(self.game["file"], self.game["main_count"], self.game["supp_count"]):
+            main = list(draw.main)
+            if self.last_draw is not None and draw.draw_number <= self.last_draw[0]:
+                return new_draws, [draw.draw_number, main] == self.last_draw
+            new_draws.append((draw.draw_number, main, list(draw.supp)))
+        return new_draws, self.last_draw is None
+
+    def update(self):
+        """
+        Ingest draws added to the CSV since the last update.
+        Returns the number of draws ingested (all of them if the index had to be rebuilt).
+        """
+        stat = os.stat(self.game["file"])
+        if (self.mtime_ns, self.size) == (stat.st_mtime_ns, stat.st_size):
+            return 0
+
+        new_draws, continues = self._read_new_draws()
+        if not continues:
+            self.reset()
+            new_draws, _ = self._read_new_draws()
+
+        for _, main, supp in reversed(new_draws):
+            self.add_draw(main, supp)
+        if new_draws:
+            self.last_draw = [new_draws[0][0], new_draws[0][1]]
+        self.mtime_ns, self.size = stat.st_mtime_ns, stat.st_size
+        return len(new_draws)
+
+    # Queries
+
+    @staticmethod
+    def _ordered(counts, last_seen):
+        # Most common first; ties like Counter over the newest-first history
+        return sorted(counts.items(),
+                      key=lambda item: (-item[1], -last_seen[item[0]][1], last_seen[item[0]][2]))
+
+    def most_common(self, kind="main", window=False):
+        """(number, count) pairs, most common first, for "main" or "supp" numbers."""
+        entries = self.main if kind == "main" else self.supp
+        if not window:
+            return rank_numbers(entries)
+        counts = self.window_main if kind == "main" else self.window_supp
+        return self._ordered(counts, entries)
+
+    def pair_counts(self, window=False):
+        """Main number pair -> number of draws they were drawn together."""
+        return dict(self.window_pairs if window else self.pairs)
+
+    def window_draws(self, kind="main"):
+        """Number of draws in the rolling window (with supplementary numbers, for "supp")."""
+        if kind == "main":
+            return len(self.recent)
+        return sum(1 for _, supp in self.recent if supp)
+
+    # Persistence
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if (data.get("version") != INDEX_VERSION or data.get("window") != self.window
+                or data.get("counts") != [self.game["main_count"], self.game["supp_count"]]):
+            return False
+
+        self.mtime_ns, self.size = data["mtime_ns"], data["size"]
+        self.last_draw = data["last_draw"]
+        self.seq, self.draws, self.supp_draws = data["seq"], data["draws"], data["supp_draws"]
+        self.main = {int(num): entry for num, entry in data["main"].items()}
+        self.supp = {int(num): entry for num, entry in data["supp"].items()}
+        self.pairs = {_key_pair(key): count for key, count in data["pairs"].items()}
+        self.recent = deque((main, supp) for main, supp in data["recent"])
+        for main, supp in self.recent:
+            self._window_add(main, supp, combinations(sorted(main), 2), 1)
+        return True
+
+    def save(self):
+        data = {
+            "version": INDEX_VERSION,
+            "counts": [self.game["main_count"], self.game["supp_count"]],
+            "window": self.window,
+            "mtime_ns": self.mtime_ns,
+            "size": self.size,
+            "last_draw": self.last_draw,
+            "seq": self.seq,
+            "draws": self.draws,
+            "supp_draws": self.supp_draws,
+            "main": self.main,
+            "supp": self.supp,
+            "pairs": {_pair_key(pair): count for pair, count in self.pairs.items()},
+            "recent": list(self.recent),
+        }
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
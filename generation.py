@@ -0,0 +1,419 @@
+import random
+from bisect import bisect_right
+from itertools import accumulate, combinations
+from math import comb
+
+import instrumentation
+from line_codec import CombinationCodec
+
+
+class WeightedSampler:
+    """
+    Weighted sampling without replacement over a fixed population.
+
+    Each pick has probability proportional to the weights of the elements not
+    picked yet, exactly like drawing one element at a time from what is left.
+    Two ways of making a pick are used, both with that same distribution:
+
+    - While the picked elements hold at most half of the total weight, draw
+      from the full population (bisect on precomputed cumulative weights) and
+      redraw on an element that was already picked.
+    - Otherwise, search a Fenwick (binary indexed) tree holding only the
+      remaining weights, in O(log n).
+
+    Picked weights are put back after every sample, so one sampler can draw
+    any number of lines without being rebuilt.
+    """
+
+    def __init__(self, population, weights, seed=None, rng=None):
+        self.population = list(population)
+        self.weights = list(weights)
+        self.size = len(self.population)
+        if rng is None:
+            rng = random.Random(seed) if seed is not None else random
+        self.rng = rng
+        self.cum_weights = list(accumulate(self.weights))
+        self.total = self.cum_weights[-1] if self.cum_weights else 0
+        self.tree = [0] * (self.size + 1)
+        for i, w in enumerate(self.weights, start=1):
+            self.tree[i] += w
+            parent = i + (i & -i)
+            if parent <= self.size:
+                self.tree[parent] += self.tree[i]
+        self.top_bit = 1 << (self.size.bit_length() - 1) if self.size else 0
+
+    def _add(self, i, delta):
+        tree = self.tree
+        i += 1
+        while i <= self.size:
+            tree[i] += delta
+            i += i & -i
+
+    def _find(self, r):
+        # Smallest index whose prefix sum reaches r
+        tree = self.tree
+        size = self.size
+        pos = 0
+        step = self.top_bit
+        while step:
+            nxt = pos + step
+            if nxt <= size and tree[nxt] < r:
+                pos = nxt
+                r -= tree[nxt]
+            step >>= 1
+        return min(pos, size - 1)
+
+    def sample(self, k):
+        return [self.population[i] for i in self.sample_indices(k)]
+
+    def sample_indices(self, k):
+        """Like sample, but returns positions in the population."""
+        k = min(k, self.size)
+        chosen = []
+        taken = set()
+        total = self.total
+        remaining = total
+        rand = self.rng.random
+        cum_weights = self.cum_weights
+
+        # Redraw from the full population while it is cheap to do so
+        while len(chosen) < k and remaining > 0 and remaining * 2 >= total:
+            i = bisect_right(cum_weights, rand() * total)
+            if i not in taken and i < self.size:
+                taken.add(i)
+                chosen.append(i)
+                remaining -= self.weights[i]
+
+        if len(chosen) < k:
+            for i in chosen:
+                self._add(i, -self.weights[i])
+            while len(chosen) < k:
+                r = self.rng.uniform(0, remaining) if remaining > 0 else 0
+                i = self._find(r) if r > 0 else -1
+                while i >= 0 and (i in taken or self.weights[i] <= 0):
+                    # Float rounding pushed the search past the last live weight
+                    i -= 1
+                if i < 0:
+                    # All remaining weights are zero: take the first remaining
+                    # element, as the linear walk would
+                    i = next(j for j in range(self.size) if j not in taken)
+                taken.add(i)
+                chosen.append(i)
+                remaining -= self.weights[i]
+                self._add(i, -self.weights[i])
+            for i in chosen:
+                self._add(i, self.weights[i])
+
+        return chosen
+
+
+@instrumentation.timed("sample")
+def weighted_sample_without_replacement(population, weights, k, seed=None):
+    """
+    Select k unique elements from 'population' based on 'weights'.
+    Higher weight => higher probability of being selected.
+    Pass 'seed' (an int) for a reproducible selection.
+    """
+    return WeightedSampler(population, weights, seed).sample(k)
+
+
+def cover_lines(pool, count, lines_to_generate, strength=2, seed=None):
+    """
+    Greedy covering of the pairs (strength 2) or triples (strength 3) of 'pool'.
+
+    Each line is built one number at a time, always adding the number that
+    completes the most pairs/triples no earlier line has covered. Ties go to
+    the number used in the fewest lines so far, then to the earlier number in
+    'pool' (pass the pool in frequency order to favour frequent numbers), or
+    at random if 'seed' is given. Once everything is covered, coverage starts
+    over, so any number of lines can be asked for.
+
+    Uncovered pairs are kept as one bitmask per number (bit j of pair_masks[i]
+    set while {i, j} is uncovered) and uncovered triples as one per pair, so
+    scoring a candidate is a handful of AND/popcounts.
+    """
+    if strength not in (2, 3):
+        raise ValueError("Coverage strength must be 2 (pairs) or 3 (triples).")
+    n = len(pool)
+    if count < strength or n < count:
+        raise ValueError(f"Need at least {count} numbers and lines of at least {strength} for coverage.")
+    rng = random.Random(seed) if seed is not None else None
+    full = (1 << n) - 1
+    total = comb(n, strength)
+
+    def reset():
+        if strength == 2:
+            return [full ^ (1 << i) for i in range(n)], total
+        return [[full ^ (1 << i) ^ (1 << j) for j in range(n)] for i in range(n)], total
+
+    uncovered, remaining = reset()
+    usage = [0] * n
+    seen = set()
+    lines = []
+    for _ in range(lines_to_generate):
+        tiebreak = [rng.random() for _ in range(n)] if rng else [-i for i in range(n)]
+        starts = sorted(range(n), key=lambda i: (-usage[i], tiebreak[i]), reverse=True)
+        for start in starts:
+            chosen = [start]
+            chosen_mask = 1 << start
+            while len(chosen) < count:
+                if strength == 2:
+                    gains = ((uncovered[i] & chosen_mask).bit_count() for i in range(n))
+                else:
+                    gains = (sum((uncovered[i][a] & chosen_mask).bit_count() for a in chosen)
+                             for i in range(n))
+                best = max((gain, -usage[i], tiebreak[i], i)
+                           for i, gain in enumerate(gains) if not chosen_mask >> i & 1)[3]
+                chosen.append(best)
+                chosen_mask |= 1 << best
+            if chosen_mask not in seen:
+                break
+        seen.add(chosen_mask)
+
+        # Mark the line's pairs/triples covered
+        if strength == 2:
+            newly = sum((uncovered[a] & chosen_mask).bit_count() for a in chosen) // 2
+            for a in chosen:
+                uncovered[a] &= ~chosen_mask
+        else:
+            newly = sum((uncovered[a][b] & chosen_mask).bit_count()
+                        for a in chosen for b in chosen if a != b) // 6
+            for a in chosen:
+                row = uncovered[a]
+                for b in chosen:
+                    row[b] &= ~chosen_mask
+        remaining -= newly
+        if remaining <= 0:
+            uncovered, remaining = reset()
+        for i in chosen:
+            usage[i] += 1
+        lines.append(sorted(pool[i] for i in chosen))
+    return lines
+
+
+def coverage_fraction(lines, strength=2, pool=None):
+    """Share of the pairs/triples of 'pool' (default: every number in 'lines') the lines cover."""
+    numbers = set(pool) if pool is not None else {n for line in lines for n in line}
+    covered = set()
+    for line in lines:
+        covered.update(combinations(sorted(n for n in line if n in numbers), strength))
+    total = comb(len(numbers), strength)
+    return len(covered) / total if total else 0.0
+
+
+# Lines are remembered by their combination rank in a bitmap while the space
+# of combinations fits in MAX_BITMAP_BITS (128 MiB); otherwise in a set.
+MAX_BITMAP_BITS = 1 << 30
+
+MAX_REDRAWS = 10_000  # Repeated lines drawn in a row before iter_unique_lines gives up
+
+
+class SeenLines:
+    """
+    Remembers which lines have been generated, in memory bounded by the
+    number of possible lines rather than the number generated.
+
+    A line is a list of main indices into a pool of 'main_size' numbers plus
+    (if 'supp_size') a list of supp indices. Its combinatorial rank (see
+    line_codec) is one int, marked in a bitmap. If the lines
+    with supplementaries don't fit in a bitmap but the main combinations do,
+    only main combinations are tracked, which makes every line's main numbers
+    distinct (a stronger guarantee). 'capacity' is the number of distinct
+    lines that can be tracked.
+    """
+
+    def __init__(self, main_size, main_count, supp_size=0, supp_count=0):
+        self.main_codec = CombinationCodec(main_size, main_count, first=0)
+        self.supp_codec = CombinationCodec(supp_size, supp_count, first=0)
+        main_space = self.main_codec.total
+        supp_space = self.supp_codec.total if supp_count else 1
+        if main_space * supp_space <= MAX_BITMAP_BITS:
+            self.with_supp = supp_count > 0
+            self.capacity = main_space * supp_space
+        else:
+            self.with_supp = False
+            self.capacity = main_space
+        self.supp_space = supp_space
+        self.bitmap = bytearray((self.capacity + 7) // 8) if self.capacity <= MAX_BITMAP_BITS else None
+        self.keys = set() if self.bitmap is None else None
+
+    def add(self, main, supp=()):
+        """Mark a line as generated. Returns False if it had been already."""
+        key = self.main_codec.encode(main)
+        if self.with_supp:
+            key = key * self.supp_space + self.supp_codec.encode(supp)
+        if self.bitmap is None:
+            if key in self.keys:
+                return False
+            self.keys.add(key)
+            return True
+        byte, bit = key >> 3, 1 << (key & 7)
+        if self.bitmap[byte] & bit:
+            return False
+        self.bitmap[byte] |= bit
+        return True
+
+
+def iter_unique_lines(main_count, supp_count, pool_main, pool_supp, lines_to_generate,
+                      main_weights=None, supp_weights=None, seed=None, supp_in_key=True):
+    """
+    Yield weighted lines like generate_lines, but never the same line twice.
+
+    Lines are produced one at a time, so they can be written out as they come
+    and only the SeenLines bitmap stays in memory, however many are asked for.
+    A line that was already produced is drawn again, up to MAX_REDRAWS times in a row.
+
+    - supp_in_key: Whether the supplementary numbers make a line different
+      (False for games where players don't pick them).
+    Raises ValueError if more than half of the possible lines are asked for,
+    since redrawing would then take too long, and (while iterating) if the
+    weights are so skewed that MAX_REDRAWS repeats come up in a row.
+    """
+    seen = SeenLines(len(pool_main), main_count,
+                     len(pool_supp) if supp_in_key else 0, supp_count if supp_in_key else 0)
+    if lines_to_generate > seen.capacity // 2:
+        raise ValueError(f"Cannot generate {lines_to_generate} unique lines: at most "
+                         f"{seen.capacity // 2} (half of the {seen.capacity} possible) can be asked for.")
+    rng = random.Random(seed) if seed is not None else None
+    main_sampler = WeightedSampler(pool_main, main_weights or [1] * len(pool_main), rng=rng)
+    supp_sampler = None
+    if supp_count > 0:
+        supp_sampler = WeightedSampler(pool_supp, supp_weights or [1] * len(pool_supp), rng=rng)
+    return _unique_lines(main_sampler, supp_sampler, main_count, supp_count, lines_to_generate, seen)
+
+
+def _unique_lines(main_sampler, supp_sampler, main_count, supp_count, lines_to_generate, seen):
+    pool_main = main_sampler.population
+    pool_supp = supp_sampler.population if supp_sampler else []
+    generated = 0
+    redraws = 0
+    while generated < lines_to_generate:
+        main = main_sampler.sample_indices(main_count)
+        supp = supp_sampler.sample_indices(supp_count) if supp_sampler else []
+        if not seen.add(main, supp):
+            redraws += 1
+            if redraws >= MAX_REDRAWS:
+                raise ValueError(f"Cannot generate {lines_to_generate} unique lines: the weights kept "
+                                 f"repeating lines after {generated}.")
+            continue
+        redraws = 0
+        generated += 1
+        yield (sorted(pool_main[i] for i in main), sorted(pool_supp[i] for i in supp))
+
+
+def _pair_weighted_sample(weights, lifts, k, rng):
+    # Indices of k picks; after the first, each candidate's weight is scaled by
+    # its mean pair lift with the numbers already picked
+    n = len(weights)
+    chosen = []
+    lift_sums = [0.0] * n
+    for _ in range(min(k, n)):
+        if chosen:
+            scale = 1 / len(chosen)
+            step_weights = [0 if i in chosen else weights[i] * lift_sums[i] * scale for i in range(n)]
+        else:
+            step_weights = list(weights)
+        if not any(step_weights):
+            step_weights = [0 if i in chosen else 1 for i in range(n)]
+        i = rng.choices(range(n), step_weights)[0]
+        chosen.append(i)
+        row = lifts[i]
+        for j in range(n):
+            lift_sums[j] += row[j]
+    return chosen
+
+
+@instrumentation.timed("generate")
+def generate_lines(main_count, supp_count, pool_main, pool_supp,
+                   lines_to_generate=5, main_weights=None, supp_weights=None,
+                   deterministic=False, seed=None, coverage=None, pair_lift=None):
+    """
+    Generate lottery lines based on historical frequency.
+    
+    - main_count: Number of main numbers per line.
+    - supp_count: Number of supplementary numbers per line.
+    - pool_main: List of main numbers sorted by frequency (descending).
+    - pool_supp: List of supplementary numbers sorted by frequency (descending).
+    - lines_to_generate: How many lines to generate.
+    - main_weights: Weights for main numbers (for weighted sampling).
+    - supp_weights: Weights for supplementary numbers (for weighted sampling).
+    - deterministic: If True, pick top frequency numbers without repetition.
+    - seed: Optional int seed for reproducible weighted sampling.
+    - coverage: 2 or 3 to spread the lines over as many number pairs or
+      triples of pool_main as possible (see cover_lines); supplementary
+      numbers are then dealt in frequency order, wrapping around (ValueError
+      if pool_supp has fewer than supp_count numbers).
+    - pair_lift: Optional function lift(a, b) (see cooccurrence.CooccurrenceIndex.pair_lift)
+      for weighted sampling: each main number after the first is weighted by
+      its frequency times its mean lift with the numbers already on the line.
+    """
+    generated_lines = []
+    
+    if coverage:
+        if supp_count > 0 and len(pool_supp) < supp_count:
+            raise ValueError(f"Need at least {supp_count} supplementary numbers for coverage, "
+                             f"only {len(pool_supp)} available.")
+        main_lines = cover_lines(pool_main, main_count, lines_to_generate, coverage, seed)
+        for i, chosen_main in enumerate(main_lines):
+            if supp_count > 0:
+                start_supp = i * supp_count
+                chosen_supp = sorted({pool_supp[(start_supp + j) % len(pool_supp)] for j in range(supp_count)})
+            else:
+                chosen_supp = []
+            generated_lines.append((chosen_main, chosen_supp))
+    elif deterministic:
+        # Check total availability for a no-repetition scenario
+        total_main_available = len(pool_main)
+        total_supp_available = len(pool_supp)
+        
+        if total_main_available < main_count * lines_to_generate:
+            print(f"Not enough main numbers to generate {lines_to_generate} lines without repetition.")
+            print(f"Available main numbers: {total_main_available}, Required: {main_count * lines_to_generate}")
+            return generated_lines
+        
+        if supp_count > 0 and total_supp_available < supp_count * lines_to_generate:
+            print(f"Not enough supplementary numbers to generate {lines_to_generate} lines without repetition.")
+            print(f"Available supplementary numbers: {total_supp_available}, Required: {supp_count * lines_to_generate}")
+            return generated_lines
+        
+        for i in range(lines_to_generate):
+            start_main = i * main_count
+            end_main = start_main + main_count
+            chosen_main = sorted(pool_main[start_main:end_main])
+            
+            if supp_count > 0:
+                start_supp = i * supp_count
+                end_supp = start_supp + supp_count
+                chosen_supp = sorted(pool_supp[start_supp:end_supp])
+            else:
+                chosen_supp = []
+            
+            generated_lines.append((chosen_main, chosen_supp))
+    else:
+        # Build each sampler once and reuse it for every line
+        rng = random.Random(seed) if seed is not None else None
+        main_sampler = WeightedSampler(pool_main, main_weights, rng=rng)
+        if supp_count > 0:
+            supp_sampler = WeightedSampler(pool_supp, supp_weights, rng=rng)
+        
+        if pair_lift is not None:
+            pair_rng = rng or random
+            lifts = [[pair_lift(a, b) for b in pool_main] for a in pool_main]
+        
+        for _ in range(lines_to_generate):
+            if pair_lift is not None:
+                chosen_main = [pool_main[i] for i in _pair_weighted_sample(main_weights, lifts, main_count, pair_rng)]
+            else:
+                chosen_main = main_sampler.sample(main_count)
+            chosen_main = sorted(chosen_main)
+            
+            if supp_count > 0:
+                chosen_supp = supp_sampler.sample(supp_count)
+                chosen_supp = sorted(chosen_supp)
+            else:
+                chosen_supp = []
+            
+            generated_lines.append((chosen_main, chosen_supp))
+    
+    instrumentation.count("lines_generated", len(generated_lines))
+    return generated_lines
@@ -0,0 +1,167 @@
+import csv
+import re
+from collections import namedtuple
+from datetime import date
+
+# Streaming ingestion of Lotterywest result CSVs.
+#
+# Column positions are resolved once from the header row instead of being
+# assumed, because they differ between games and over time: Set for Life has
+# eight "Winning Number" columns (the eighth is empty since the game moved to
+# seven numbers), Powerball calls its supplementary "Powerball Number", and
+# each game has a different number of prize divisions. Rows are then parsed
+# one at a time into DrawRecords, so callers can stop reading whenever they
+# like and nothing is held in memory that they don't keep themselves.
+
+DrawRecord = namedtuple("DrawRecord", ["draw_number", "draw_date", "main", "supp", "divisions"])
+DrawRecord.__doc__ = """
+One draw from a results CSV.
+
+- draw_number: int (0 if missing).
+- draw_date: datetime.date, or None if missing.
+- main: Tuple of winning numbers, in CSV order (only the columns filled in for this draw).
+- supp: Tuple of supplementary / Powerball numbers, in CSV order.
+- divisions: Tuple of Division, one per prize division in the file (division 1 first).
+"""
+
+Division = namedtuple("Division", ["winners", "wa_winners", "prize_pool", "amount"])
+Division.__doc__ = """
+Prize division results for one draw; any field is None when the CSV leaves it empty.
+
+- winners, wa_winners: Number of winning entries (all of Australia / WA only).
+- prize_pool, amount: Division prize pool and amount per winning entry, in dollars.
+"""
+
+_DIVISION_FIELDS = {
+    "winners": "winners",
+    "winners in wa": "wa_winners",
+    "prize pool": "prize_pool",
+    "amount": "amount",
+}
+_DIVISION_RE = re.compile(r"division (\d+) (winners in wa|winners|prize pool|amount)$")
+
+
+class CsvSchema:
+    """
+    Column indices of a results CSV, resolved from its header.
+
+    - draw_number, draw_date: Column index (None if missing).
+    - main, supp: Column indices of winning and supplementary numbers.
+    - divisions: One dict per division mapping Division field -> column index.
+    """
+
+    def __init__(self, header):
+        names = [name.strip().lower() for name in header]
+        self.draw_number = names.index("draw number") if "draw number" in names else None
+        self.draw_date = names.index("draw date") if "draw date" in names else None
+        self.main = [i for i, name in enumerate(names) if name.startswith("winning number")]
+        self.supp = [i for i, name in enumerate(names)
+                     if name.startswith("supplementary number") or name == "powerball number"]
+
+        divisions = {}
+        for i, name in enumerate(names):
+            match = _DIVISION_RE.match(name)
+            if match:
+                divisions.setdefault(int(match.group(1)), {})[_DIVISION_FIELDS[match.group(2)]] = i
+        self.divisions = [divisions[d] for d in sorted(divisions)]
+
+        if not self.main:
+            raise ValueError("No 'Winning Number' columns in the CSV header.")
+
+    @classmethod
+    def positional(cls, main_count, supp_count=0):
+        """Schema for a headerless file: draw number, date, main numbers, then supplementary numbers."""
+        schema = cls.__new__(cls)
+        schema.draw_number = 0
+        schema.draw_date = 1
+        schema.main = list(range(2, 2 + main_count))
+        schema.supp = list(range(2 + main_count, 2 + main_count + supp_count))
+        schema.divisions = []
+        return schema
+
+    def parse(self, row):
+        """Parse one data row into a DrawRecord."""
+        return DrawRecord(
+            _int_or_none(_cell(row, self.draw_number)) or 0,
+            parse_date(_cell(row, self.draw_date)),
+            _numbers(row, self.main),
+            _numbers(row, self.supp),
+            tuple(Division(_int_or_none(_cell(row, cols.get("winners"))),
+                           _int_or_none(_cell(row, cols.get("wa_winners"))),
+                           _float_or_none(_cell(row, cols.get("prize_pool"))),
+                           _float_or_none(_cell(row, cols.get("amount"))))
+                  for cols in self.divisions),
+        )
+
+
+def _cell(row, index):
+    if index is None or index >= len(row):
+        return ""
+    return row[index].strip()
+
+
+def _numbers(row, indices):
+    return tuple(int(cell) for cell in (_cell(row, i) for i in indices) if cell.isdigit())
+
+
+def _int_or_none(text):
+    try:
+        return int(text)
+    except ValueError:
+        return None
+
+
+def _float_or_none(text):
+    try:
+        return float(text.replace(",", "").lstrip("$"))
+    except ValueError:
+        return None
+
+
+def parse_date(text):
+    """Parse a 'dd/mm/yyyy' draw date; None if it can't be parsed."""
+    try:
+        day, month, year = text.split("/")
+        return date(int(year), int(month), int(day))
+    except ValueError:
+        return None
+
+
+def iter_draws(filename, main_count=None, supp_count=0):
+    """
+    Yield a DrawRecord for every row of a results CSV, in file order (newest first).
+
+    The schema comes from the header. If the file has no recognisable header
+    and main_count is given, the old positional layout is assumed (draw
+    number, date, main numbers, supplementary numbers) and the first row is
+    treated as data.
+    """
+    with open(filename, 'r', newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        try:
+            schema = CsvSchema(header)
+        except ValueError:
+            if main_count is None:
+                raise
+            schema = CsvSchema.positional(main_count, supp_count)
+            yield schema.parse(header)
+        for row in reader:
+            if row:
+                yield schema.parse(row)
+
+
+def iter_game_draws(filename, main_count, supp_count=0):
+    """
+    Like iter_draws, but only draws with exactly main_count winning numbers
+    (earlier formats of a game drew a different amount and are skipped).
+    'supp' is left empty for draws without exactly supp_count supplementaries.
+    """
+    for draw in iter_draws(filename, main_count, supp_count):
+        if len(draw.main) != main_count:
+            continue
+        if len(draw.supp) != supp_count:
+            draw = draw._replace(supp=())
+        yield draw
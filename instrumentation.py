@@ -0,0 +1,143 @@
+import atexit
+import cProfile
+import os
+import sys
+import time
+from contextlib import nullcontext
+from functools import wraps
+
+# Opt-in timing and counters for the hot paths (loading, sampling,
+# generation, checking).
+#
+# Off by default, when a stage costs one flag test. Turn it on with
+# LOTTO_PROFILE=1 in the environment or --profile on the command line; the
+# per-stage totals are then printed to stderr when the program exits. With
+# LOTTO_PROFILE_DIR=<dir> (or --profile <dir>) every outermost stage is also
+# run under cProfile and dumped to <dir>/<stage>-<pid>-<n>.prof, for
+# "python -m pstats" or snakeviz. Stages running inside process pool
+# workers aren't recorded; the stage that started the pool times them as a
+# whole.
+
+_enabled = False
+_profile_dir = None
+_stages = {}    # name -> [calls, total seconds, slowest call in seconds]
+_counters = {}  # name -> total
+_active = []    # names of the stages currently running, outermost first
+_dumps = 0
+_report_registered = False
+
+
+def enabled():
+    return _enabled
+
+
+def enable(profile_dir=None, report=True):
+    """
+    Start recording stages and counters.
+
+    - profile_dir: Also write a cProfile dump of every outermost stage here.
+    - report: Print the totals to stderr when the program exits.
+    """
+    global _enabled, _profile_dir, _report_registered
+    _enabled = True
+    _profile_dir = profile_dir
+    if profile_dir:
+        os.makedirs(profile_dir, exist_ok=True)
+    if report and not _report_registered:
+        atexit.register(print_report)
+        _report_registered = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def reset():
+    """Forget everything recorded so far."""
+    _stages.clear()
+    _counters.clear()
+
+
+def count(name, n=1):
+    """Add n to a counter (e.g. lines checked)."""
+    if _enabled:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+class _Stage:
+    def __init__(self, name):
+        self.name = name
+        self.profiler = None
+
+    def __enter__(self):
+        if _profile_dir and not _active:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        _active.append(self.name)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        global _dumps
+        elapsed = time.perf_counter() - self.start
+        _active.pop()
+        if self.profiler is not None:
+            self.profiler.disable()
+            _dumps += 1
+            self.profiler.dump_stats(os.path.join(_profile_dir, f"{self.name}-{os.getpid()}-{_dumps}.prof"))
+        totals = _stages.get(self.name)
+        if totals is None:
+            _stages[self.name] = [1, elapsed, elapsed]
+        else:
+            totals[0] += 1
+            totals[1] += elapsed
+            totals[2] = max(totals[2], elapsed)
+        return False
+
+
+_NOT_RECORDING = nullcontext()
+
+
+def stage(name):
+    """Context manager timing a block as stage 'name' (a no-op while disabled)."""
+    return _Stage(name) if _enabled else _NOT_RECORDING
+
+
+def timed(name):
+    """Decorator timing every call of a function as stage 'name'."""
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def report():
+    """
+    What has been recorded: {"stages": {name: {"calls", "seconds", "max_seconds"}},
+    "counters": {name: total}}. Nested stages are included in their parents' time.
+    """
+    return {"stages": {name: {"calls": calls, "seconds": total, "max_seconds": slowest}
+                       for name, (calls, total, slowest) in _stages.items()},
+            "counters": dict(_counters)}
+
+
+def print_report(file=None):
+    if not _stages and not _counters:
+        return
+    file = file or sys.stderr
+    print("\nProfile:", file=file)
+    for name, (calls, total, slowest) in sorted(_stages.items(), key=lambda item: -item[1][1]):
+        print(f"  {name:<24} {calls:>8} call(s) {total * 1e3:12.2f} ms total "
+              f"{total / calls * 1e3:10.3f} ms mean {slowest * 1e3:10.3f} ms max", file=file)
+    for name, total in sorted(_counters.items()):
+        print(f"  {name:<24} {total:>8}", file=file)
+
+
+if os.environ.get("LOTTO_PROFILE", "0") != "0" or os.environ.get("LOTTO_PROFILE_DIR"):
+    enable(os.environ.get("LOTTO_PROFILE_DIR"))
@@ -0,0 +1,270 @@
+import array
+import os
+import random
+import struct
+import sys
+from bisect import bisect_right
+from math import comb
+
+# Lines as combinatorial ranks.
+#
+# A k-of-n combination is numbered by its position in lexicographic order
+# (the combinatorial number system): for 6 of 45, [1, 2, 3, 4, 5, 6] is 0 and
+# [40, 41, 42, 43, 44, 45] is C(45, 6) - 1. A whole line of a game (main
+# numbers plus the supplementary numbers the player picks) becomes one int,
+# main_rank * supp_combinations + supp_rank, so storing, comparing and
+# de-duplicating lines are fixed-width integer operations, and a uniformly
+# random line is just a random rank.
+#
+# Ticket files are a header followed by the ranks as little-endian unsigned
+# ints of the smallest width that fits the game:
+#   magic, version, main_balls, main_count, supp_balls, supp_count,
+#   rank width in bytes, line count (see TICKET_HEADER_FORMAT)
+
+TICKET_SUFFIX = ".tix"
+TICKET_MAGIC = b"LOTTOTIX"
+TICKET_VERSION = 1
+TICKET_HEADER_FORMAT = "<8sHBBBBBxQ"
+TICKET_HEADER_SIZE = struct.calcsize(TICKET_HEADER_FORMAT)
+_RANK_TYPES = {2: "H", 4: "I", 8: "Q"}
+
+
+class CombinationCodec:
+    """
+    Lexicographic rank <-> combination for k numbers out of first..first+n-1.
+
+    Internally a combination is ranked in colex order of its complement
+    (number x -> n - 1 - x), which is the lexicographic rank counted from the
+    end; both directions are table lookups plus, when decoding, a bisect per
+    number.
+    """
+
+    def __init__(self, n, k, first=1):
+        if not 0 <= k <= n:
+            raise ValueError(f"Cannot choose {k} of {n} numbers.")
+        self.n = n
+        self.k = k
+        self.first = first
+        self.total = comb(n, k)
+        # columns[i][x] = C(x, i): increasing in x, so it can be bisected
+        self.columns = [[comb(x, i) for x in range(n)] for i in range(k + 1)]
+
+    def encode(self, numbers):
+        """
+        Rank of a combination (any order). Raises ValueError unless it is k
+        distinct numbers from first to first+n-1.
+        """
+        first = self.first
+        last = self.n - 1 + first
+        numbers = sorted(numbers, reverse=True)
+        if len(numbers) != self.k:
+            raise ValueError(f"Need {self.k} numbers from {first} to {last}, got {len(numbers)}.")
+        columns = self.columns
+        colex = 0
+        previous = last + 1
+        for i, x in enumerate(numbers, start=1):
+            # Descending, so a repeat or an out of range number breaks first <= x < previous
+            if not first <= x < previous:
+                raise ValueError(f"Need {self.k} distinct numbers from {first} to {last}, got {sorted(numbers)}.")
+            colex += columns[i][last - x]
+            previous = x
+        return self.total - 1 - colex
+
+    def encode_mask(self, mask):
+        """Rank of a combination given as a bitmask (bit n set for number n)."""
+        numbers = []
+        while mask:
+            low = mask & -mask
+            numbers.append(low.bit_length() - 1)
+            mask ^= low
+        return self.encode(numbers)
+
+    def decode(self, rank):
+        """Combination (ascending) with the given rank."""
+        if not 0 <= rank < self.total:
+            raise ValueError(f"Rank {rank} out of range for {self.k} of {self.n}.")
+        colex = self.total - 1 - rank
+        last = self.n - 1 + self.first
+        numbers = []
+        for i in range(self.k, 0, -1):
+            column = self.columns[i]
+            x = bisect_right(column, colex) - 1
+            colex -= column[x]
+            numbers.append(last - x)
+        return numbers
+
+    def encode_many(self, lines, typecode="Q"):
+        """Ranks of many combinations, as an array of 'typecode' (ValueError as in encode)."""
+        encode = self.encode
+        return array.array(typecode, map(encode, lines))
+
+    def decode_many(self, ranks):
+        decode = self.decode
+        return [decode(rank) for rank in ranks]
+
+
+class GameCodec:
+    """
+    Rank <-> (main numbers, supplementary numbers) for lines of a game.
+
+    Supplementary numbers are part of a line only in games where players pick
+    them; they come from the separate barrel (Powerball) or the main one.
+    """
+
+    def __init__(self, game):
+        self.main = CombinationCodec(game["main_balls"], game["main_count"])
+        self.supp = None
+        if game["user_supp_count"] > 0:
+            self.supp = CombinationCodec(game["supp_balls"] or game["main_balls"], game["user_supp_count"])
+        self.supp_total = self.supp.total if self.supp else 1
+        self.total = self.main.total * self.supp_total
+        self.width = next(width for width in sorted(_RANK_TYPES) if self.total <= 1 << (8 * width))
+        self.typecode = _RANK_TYPES[self.width]
+
+    def encode(self, main, supp=()):
+        """Rank of a line; raises ValueError for numbers that aren't a valid line of the game."""
+        rank = self.main.encode(main) * self.supp_total
+        if self.supp:
+            rank += self.supp.encode(supp)
+        return rank
+
+    def encode_masks(self, main_mask, supp_mask=0):
+        """Like encode, for a line given as bitmasks (see checker.numbers_mask)."""
+        rank = self.main.encode_mask(main_mask) * self.supp_total
+        if self.supp:
+            rank += self.supp.encode_mask(supp_mask)
+        return rank
+
+    def decode(self, rank):
+        main_rank, supp_rank = divmod(rank, self.supp_total)
+        return self.main.decode(main_rank), self.supp.decode(supp_rank) if self.supp else []
+
+    def encode_many(self, lines):
+        """Ranks of (main, supp) lines as an array of this game's rank type (ValueError as in encode)."""
+        encode = self.encode
+        return array.array(self.typecode, (encode(main, supp) for main, supp in lines))
+
+    def decode_many(self, ranks):
+        decode = self.decode
+        return [decode(rank) for rank in ranks]
+
+    def random_ranks(self, count, seed=None, unique=True):
+        """
+        Ranks of 'count' uniformly random lines (each possible line equally likely).
+        With 'unique' no line repeats (count can't exceed the number of possible lines).
+        """
+        rng = random.Random(seed)
+        if unique:
+            return array.array(self.typecode, rng.sample(range(self.total), count))
+        return array.array(self.typecode, (rng.randrange(self.total) for _ in range(count)))
+
+    def random_lines(self, count, seed=None, unique=True):
+        return self.decode_many(self.random_ranks(count, seed, unique))
+
+
+# Ticket files
+
+def is_ticket_file(filename):
+    """Whether a file starts with the ticket file magic."""
+    try:
+        with open(filename, 'rb') as f:
+            return f.read(len(TICKET_MAGIC)) == TICKET_MAGIC
+    except OSError:
+        return False
+
+
+def _ticket_header(codec, count):
+    supp = codec.supp
+    return struct.pack(TICKET_HEADER_FORMAT, TICKET_MAGIC, TICKET_VERSION,
+                       codec.main.n, codec.main.k, supp.n if supp else 0, supp.k if supp else 0,
+                       codec.width, count)
+
+
+def _to_file(ranks, f):
+    # Ticket files are little-endian whatever the machine
+    if sys.byteorder == "big":
+        ranks = array.array(ranks.typecode, ranks)
+        ranks.byteswap()
+    ranks.tofile(f)
+
+
+def write_ticket_file(filename, game, lines, chunk_size=1 << 16):
+    """
+    Write (main, supp) lines as a packed ticket file of ranks.
+    'lines' can be any iterable; it is encoded and written a chunk at a time.
+    Returns the number of lines written.
+    """
+    codec = GameCodec(game)
+    count = 0
+    tmp_path = f"{filename}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_ticket_header(codec, 0))
+        chunk = array.array(codec.typecode)
+        for main, supp in lines:
+            chunk.append(codec.encode(main, supp))
+            if len(chunk) >= chunk_size:
+                count += len(chunk)
+                _to_file(chunk, f)
+                chunk = array.array(codec.typecode)
+        count += len(chunk)
+        _to_file(chunk, f)
+        f.seek(0)
+        f.write(_ticket_header(codec, count))
+    os.replace(tmp_path, filename)
+    return count
+
+
+def write_ticket_ranks(filename, game, ranks):
+    """Write an array of line ranks (e.g. from GameCodec.random_ranks) as a ticket file."""
+    codec = GameCodec(game)
+    if ranks.typecode != codec.typecode:
+        ranks = array.array(codec.typecode, ranks)
+    with open(filename, 'wb') as f:
+        f.write(_ticket_header(codec, len(ranks)))
+        _to_file(ranks, f)
+    return len(ranks)
+
+
+def iter_ticket_ranks(filename, game, chunk_size=1 << 16):
+    """
+    Yield arrays of up to 'chunk_size' ranks from a ticket file written for 'game'.
+    Raises ValueError if the file isn't a ticket file for this game.
+    """
+    codec = GameCodec(game)
+    with open(filename, 'rb') as f:
+        raw = f.read(TICKET_HEADER_SIZE)
+        if len(raw) != TICKET_HEADER_SIZE:
+            raise ValueError(f"{filename} is not a ticket file.")
+        magic, version, *layout, width, count = struct.unpack(TICKET_HEADER_FORMAT, raw)
+        if magic != TICKET_MAGIC or version != TICKET_VERSION:
+            raise ValueError(f"{filename} is not a ticket file.")
+        if raw != _ticket_header(codec, count):
+            raise ValueError(f"{filename} holds lines of a different game.")
+        remaining = count
+        while remaining:
+            chunk = array.array(codec.typecode)
+            want = min(chunk_size, remaining)
+            data = f.read(want * width)
+            if len(data) != want * width:
+                raise ValueError(f"{filename} is truncated.")
+            chunk.frombytes(data)
+            if sys.byteorder == "big":
+                chunk.byteswap()
+            remaining -= want
+            yield chunk
+
+
+def read_ticket_file(filename, game):
+    """All ranks of a ticket file as one array."""
+    ranks = array.array(GameCodec(game).typecode)
+    for chunk in iter_ticket_ranks(filename, game):
+        ranks.extend(chunk)
+    return ranks
+
+
+def compare_tickets(ranks_a, ranks_b):
+    """(lines in both, only in a, only in b), counting distinct lines, for two rank arrays."""
+    a = set(ranks_a)
+    b = set(ranks_b)
+    common = len(a & b)
+    return common, len(a) - common, len(b) - common
@@ -1,6 +1,90 @@
+import argparse
 import csv
+import json
+import os
+import sys
 from collections import Counter
-import random
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from datetime import date
+
+from backtesting import STRATEGIES, run_backtest
+from checker import (check_lines_against_history, check_lines_file, iter_line_masks, mask_numbers,
+                     match_summary, numbers_mask, validate_winning_numbers)
+from cooccurrence import CooccurrenceIndex
+from draw_store import load_columns
+from frequency import DrawIncidence
+from frequency_index import DEFAULT_WINDOW, FrequencyIndex
+from generation import generate_lines, iter_unique_lines, weighted_sample_without_replacement  # Re-exported, it lived here
+from ingest import parse_date
+import instrumentation
+from line_codec import TICKET_SUFFIX, GameCodec, write_ticket_file
+from odds import division_table, odds_report
+from prizes import dividend_distribution, jackpot_rollovers, load_prize_history, prize_report
+from randomness import SIGNIFICANCE, randomness_reports
+from weighting import RunningWeights
+
+# Games and their configurations
+#   main_balls / supp_balls: size of the barrels; supp_balls is None when the
+#     supplementary numbers are drawn from the main barrel (and so are matched
+#     against the player's main numbers for prizes)
+#   divisions: (main matches, supp matches) outcomes winning each prize
+#     division, division 1 first
+GAMES = {
+    "1": {
+        "name": "Saturday Lotto",
+        "file": "saturday-lotto.csv",
+        "main_count": 6,
+        "supp_count": 2,
+        "user_supp_count": 0,  # Users do not pick supplementary numbers
+        "main_balls": 45,
+        "supp_balls": None,
+        "divisions": [[(6, 0)], [(5, 1)], [(5, 0)], [(4, 0), (4, 1), (4, 2)],
+                      [(3, 1), (3, 2)], [(2, 2), (1, 2)]]
+    },
+    "2": {
+        "name": "Oz Lotto",
+        "file": "oz-lotto.csv",
+        "main_count": 7,
+        "supp_count": 3,
+        "user_supp_count": 3,  # Lines carry supplementary picks, but prizes match the main numbers
+        "main_balls": 47,
+        "supp_balls": None,
+        "divisions": [[(7, 0)], [(6, 1)], [(6, 0)], [(5, 1), (5, 2)], [(5, 0)],
+                      [(4, 0), (4, 1), (4, 2), (4, 3)], [(3, 1), (3, 2), (3, 3)]]
+    },
+    "3": {
+        "name": "Powerball",
+        "file": "powerball.csv",
+        "main_count": 7,
+        "supp_count": 1,
+        "user_supp_count": 1,  # Users pick supplementary numbers (Powerball)
+        "main_balls": 35,
+        "supp_balls": 20,
+        "divisions": [[(7, 1)], [(7, 0)], [(6, 1)], [(6, 0)], [(5, 1)],
+                      [(4, 1)], [(5, 0)], [(3, 1)], [(2, 1)]]
+    },
+    "4": {
+        "name": "Set for Life",
+        "file": "set-for-life.csv",
+        "main_count": 7,
+        "supp_count": 2,
+        "user_supp_count": 2,  # Lines carry supplementary picks, but prizes match the main numbers
+        "main_balls": 44,
+        "supp_balls": None,
+        "divisions": [[(7, 0)], [(6, 1)], [(6, 0)], [(5, 1), (5, 2)], [(5, 0)],
+                      [(4, 1), (4, 2)], [(4, 0)], [(3, 1), (3, 2)]]
+    }
+}
+
+# Above this many lines the interactive generator offers to stream them to lines.csv
+STREAM_LINES = 10_000
+
+# Pairs and triples listed by the frequency view
+TOP_COMBINATIONS = 10
+
+# Reports already worked out this session, so switching games or modes doesn't reread the CSVs
+_session_cache = {}
 
 def get_integer_input(prompt):
     while True:
@@ -24,37 +108,22 @@ def get_unique_numbers(prompt, count, allow_duplicates=False):
 def load_historical_data(filename, main_count, supp_count=0):
     """
     Load historical data from the specified CSV file.
-    Assumes:
-      col1: draw number
-      col2: draw date
-      Following columns: main numbers first, then supplementary numbers.
+    Columns are found by their header ("Winning Number N", "Supplementary Number N"
+    / "Powerball Number"), see ingest.py. Only draws with exactly main_count
+    winning numbers are used; supplementary numbers only from draws with
+    exactly supp_count of them.
+    Returns flat lists of main and supplementary numbers, most recent draw first.
     """
     main_numbers = []
     supp_numbers = []
     
     try:
-        with open(filename, 'r', newline='', encoding='utf-8') as f:
-            reader = csv.reader(f)
-            header = next(reader, None)  # Attempt to skip header if present
-            for row in reader:
-                # We expect at least 2 + main_count (+ supp_count) columns
-                if len(row) < (2 + main_count + supp_count):
-                    continue
-                
-                # Extract main numbers
-                row_main = row[2:2+main_count]
-                row_main = [int(n) for n in row_main if n.isdigit()]
-                if len(row_main) != main_count:
-                    continue
-                main_numbers.extend(row_main)
-                
-                # Extract supplementary numbers
-                if supp_count > 0:
-                    row_supp = row[2+main_count : 2+main_count+supp_count]
-                    row_supp = [int(n) for n in row_supp if n.isdigit()]
-                    if len(row_supp) == supp_count:
-                        supp_numbers.extend(row_supp)
-                        
+        # Goes through the columnar cache in draw_store; the CSV is only
+        # re-parsed when it has changed since the cache was built.
+        columns = load_columns(filename, main_count, supp_count)
+        main_numbers = columns.flat_main()
+        if supp_count > 0:
+            supp_numbers = columns.flat_supp()
     except FileNotFoundError:
         print(f"File {filename} not found.")
     except Exception as e:
@@ -62,170 +131,250 @@ def load_historical_data(filename, main_count, supp_count=0):
                     
     return main_numbers, supp_numbers
 
-def weighted_sample_without_replacement(population, weights, k):
+def find_game(name, games=GAMES):
     """
-    Select k unique elements from 'population' based on 'weights'.
-    Higher weight => higher probability of being selected.
+    Look up a game by menu number ("2"), CSV name ("oz-lotto" / "oz-lotto.csv")
+    or display name ("Oz Lotto"), ignoring case. Returns None if nothing matches.
     """
-    selected = []
-    population = population.copy()
-    weights = weights.copy()
+    wanted = name.strip().lower()
+    for key, game in games.items():
+        stem = os.path.splitext(game["file"])[0]
+        if wanted in (key, game["name"].lower(), game["file"].lower(), stem.lower()):
+            return game
+    return None
 
-    for _ in range(k):
-        if not population:
-            break
-        total = sum(weights)
-        if total == 0:
-            # If all remaining weights are zero, select uniformly
-            selected.append(population.pop(0))
-            weights.pop(0)
-            continue
-        r = random.uniform(0, total)
-        upto = 0
-        for i, w in enumerate(weights):
-            upto += w
-            if upto >= r:
-                selected.append(population.pop(i))
-                weights.pop(i)
-                break
-    return selected
-
-def generate_lines(main_count, supp_count, pool_main, pool_supp,
-                   lines_to_generate=5, main_weights=None, supp_weights=None,
-                   deterministic=False):
+def frequency_report(game, window=None):
     """
-    Generate lottery lines based on historical frequency.
-    
-    - main_count: Number of main numbers per line.
-    - supp_count: Number of supplementary numbers per line.
-    - pool_main: List of main numbers sorted by frequency (descending).
-    - pool_supp: List of supplementary numbers sorted by frequency (descending).
-    - lines_to_generate: How many lines to generate.
-    - main_weights: Weights for main numbers (for weighted sampling).
-    - supp_weights: Weights for supplementary numbers (for weighted sampling).
-    - deterministic: If True, pick top frequency numbers without repetition.
+    Frequency of each number for a game, without printing.
+    Returns a dict with:
+      "draws": number of draws counted for main numbers
+      "main": list of (number, times drawn), most frequent first
+      "supp_draws", "supp": the same for supplementary numbers (0 and [] if none)
+    Pass 'window' to only count the most recent draws.
+    Reports are kept for the rest of the session (see clear_session_cache).
     """
-    generated_lines = []
-    
-    if deterministic:
-        # Check total availability for a no-repetition scenario
-        total_main_available = len(pool_main)
-        total_supp_available = len(pool_supp)
-        
-        if total_main_available < main_count * lines_to_generate:
-            print(f"Not enough main numbers to generate {lines_to_generate} lines without repetition.")
-            print(f"Available main numbers: {total_main_available}, Required: {main_count * lines_to_generate}")
-            return generated_lines
-        
-        if supp_count > 0 and total_supp_available < supp_count * lines_to_generate:
-            print(f"Not enough supplementary numbers to generate {lines_to_generate} lines without repetition.")
-            print(f"Available supplementary numbers: {total_supp_available}, Required: {supp_count * lines_to_generate}")
-            return generated_lines
-        
-        for i in range(lines_to_generate):
-            start_main = i * main_count
-            end_main = start_main + main_count
-            chosen_main = sorted(pool_main[start_main:end_main])
-            
-            if supp_count > 0:
-                start_supp = i * supp_count
-                end_supp = start_supp + supp_count
-                chosen_supp = sorted(pool_supp[start_supp:end_supp])
-            else:
-                chosen_supp = []
-            
-            generated_lines.append((chosen_main, chosen_supp))
-    else:
-        for _ in range(lines_to_generate):
-            chosen_main = weighted_sample_without_replacement(pool_main, main_weights, main_count)
-            chosen_main = sorted(chosen_main)
-            
-            if supp_count > 0:
-                chosen_supp = weighted_sample_without_replacement(pool_supp, supp_weights, supp_count)
-                chosen_supp = sorted(chosen_supp)
-            else:
-                chosen_supp = []
-            
-            generated_lines.append((chosen_main, chosen_supp))
+    key = ("frequency", game["file"], window)
+    report = _session_cache.get(key)
+    if report is None:
+        report = _load_frequency_report(game, window)
+        if report["main"]:
+            _session_cache[key] = report
+    return report
+
+def clear_session_cache(game=None):
+    """Forget reports kept in memory (only 'game's, if given), so the next request reads the CSVs again."""
+    if game is None:
+        _session_cache.clear()
+        return
+    for key in [key for key in list(_session_cache) if key[1] == game["file"]]:
+        _session_cache.pop(key, None)
+
+def _load_frequency_report(game, window=None):
+    report = {"draws": 0, "main": [], "supp_draws": 0, "supp": []}
+    if window is None or window == DEFAULT_WINDOW:
+        # All-time and rolling-window counts come from the persistent index, which only reads new draws
+        try:
+            index = FrequencyIndex.open(game)
+        except FileNotFoundError:
+            print(f"File {game['file']} not found.")
+            return report
+        except Exception as e:
+            print(f"An error occurred while reading {game['file']}: {e}")
+            return report
+        windowed = window is not None
+        report["draws"] = index.window_draws() if windowed else index.draws
+        report["main"] = index.most_common("main", windowed)
+        if index.supp_draws:
+            report["supp_draws"] = index.window_draws("supp") if windowed else index.supp_draws
+            report["supp"] = index.most_common("supp", windowed)
+        return report
     
-    return generated_lines
+    main_count = game["main_count"]
+    supp_count = game["supp_count"]
+    main_numbers, supp_numbers = load_historical_data(game["file"], main_count, supp_count)
+    if main_numbers:
+        main_incidence = DrawIncidence(main_numbers, main_count)
+        report["draws"] = min(main_incidence.num_draws, window or main_incidence.num_draws)
+        report["main"] = [(num, freq) for num, freq in main_incidence.most_common(window) if freq]
+    if supp_count > 0 and supp_numbers:
+        supp_incidence = DrawIncidence(supp_numbers, supp_count)
+        report["supp_draws"] = min(supp_incidence.num_draws, window or supp_incidence.num_draws)
+        report["supp"] = [(num, freq) for num, freq in supp_incidence.most_common(window) if freq]
+    return report
 
-def read_user_lines_from_csv(filename, game):
+def weighted_frequency_report(game, half_life=None, window=None, since=None, until=None):
     """
-    Reads ticket lines from a CSV file generated by this tool.
-    Format:
-      If user_supp_count > 0:
-         "Line #", "Main Numbers" (space-separated), "Supplementary Numbers" (space-separated)
-      If user_supp_count == 0:
-         "Line #", "Main Numbers" (space-separated)
+    Like frequency_report, but each number is weighted by the draws it came up
+    in under a recency scheme (see weighting.RunningWeights) rather than
+    counted over the whole history:
+      half_life: draws after which a draw counts half as much
+      window: only the most recent N draws
+      since / until: only draws dated within this range (datetime.date)
+    The report can be passed to generate_game_lines like a frequency_report.
+    Raises ValueError for an invalid scheme.
     """
-    user_lines = []
-    main_count = game["main_count"]
-    supp_count = game["user_supp_count"]  # Number of supplementary numbers the user picks
-    
+    report = {"draws": 0, "main": [], "supp_draws": 0, "supp": []}
     try:
-        with open(filename, 'r', newline='', encoding='utf-8') as f:
-            reader = csv.reader(f)
-            
-            # Try reading the first row as a potential header
-            first_row = next(reader, None)
-            if first_row and first_row[0].strip().lower() == "line #":
-                # It's a header row, skip it
-                pass
-            else:
-                # Possibly a real data row, so re-inject it
-                if first_row is not None:
-                    all_rows = [first_row] + list(reader)
-                else:
-                    all_rows = []
-                reader = iter(all_rows)
-            
-            for row in reader:
-                expected_cols = 3 if supp_count > 0 else 2
-                if len(row) < expected_cols:
-                    print(f"Skipping row (not enough columns): {row}")
-                    continue
-                
-                main_str = row[1].strip()
-                mains = main_str.split()
-                
-                # Check length
-                if len(mains) != main_count:
-                    print(f"Skipping row (main count mismatch): {row}")
-                    continue
-                
-                # Convert to int
-                try:
-                    main_nums = [int(x) for x in mains]
-                except ValueError:
-                    print(f"Skipping row (could not convert main numbers to int): {row}")
-                    continue
-                
-                supp_nums = []
-                if supp_count > 0:
-                    supp_str = row[2].strip()
-                    sups = supp_str.split()
-                    
-                    if len(sups) != supp_count:
-                        print(f"Skipping row (supp count mismatch): {row}")
-                        continue
-                    try:
-                        supp_nums = [int(x) for x in sups]
-                    except ValueError:
-                        print(f"Skipping row (could not convert supplementary to int): {row}")
-                        continue
-                
-                user_lines.append({
-                    "main": main_nums,
-                    "supp": supp_nums
-                })
-    
+        weights = RunningWeights.for_game(game, half_life, window, since, until)
     except FileNotFoundError:
-        print(f"File {filename} not found.")
-    except Exception as e:
-        print(f"An error occurred while reading {filename}: {e}")
+        print(f"File {game['file']} not found.")
+        return report
+    report["draws"] = weights.draws
+    report["main"] = weights.most_common("main")
+    if game["supp_count"] > 0:
+        report["supp_draws"] = weights.supp_draws
+        report["supp"] = weights.most_common("supp")
+    return report
+
+def parse_date_arg(text):
+    """A date given as dd/mm/yyyy (like the CSVs) or yyyy-mm-dd; None if it can't be parsed."""
+    day = parse_date(text.strip())
+    if day is None:
+        try:
+            day = date.fromisoformat(text.strip())
+        except ValueError:
+            return None
+    return day
+
+def frequency_pools(report):
+    """Split a frequency_report into (main_sorted, main_weights, supp_sorted, supp_weights) for generate_lines."""
+    main_sorted = [num for num, freq in report["main"]]
+    main_weights = [freq for num, freq in report["main"]]
+    supp_sorted = [num for num, freq in report["supp"]]
+    supp_weights = [freq for num, freq in report["supp"]]
+    return main_sorted, main_weights, supp_sorted, supp_weights
+
+def max_deterministic_lines(game, main_sorted, supp_sorted):
+    """How many lines deterministic selection can make without repeating a number."""
+    max_main_lines = len(main_sorted) // game["main_count"]
+    max_supp_lines = len(supp_sorted) // game["supp_count"] if game["supp_count"] > 0 else float('inf')
+    return min(max_main_lines, max_supp_lines)
+
+def _game_pools(game, lines_to_generate, report, top):
+    # frequency_pools for generation, after the checks every mode shares
+    if report is None:
+        report = frequency_report(game)
+    if not report["main"]:
+        raise ValueError("No main numbers loaded. Check CSV formatting.")
+    if lines_to_generate <= 0:
+        raise ValueError("Number of lines must be greater than 0.")
     
-    return user_lines
+    main_sorted, main_weights, supp_sorted, supp_weights = frequency_pools(report)
+    if top is not None:
+        if top < game["main_count"]:
+            raise ValueError(f"Need at least the top {game['main_count']} numbers for a line.")
+        main_sorted, main_weights = main_sorted[:top], main_weights[:top]
+    return main_sorted, main_weights, supp_sorted, supp_weights
+
+def generate_game_lines(game, lines_to_generate, deterministic=False, seed=None, report=None,
+                        coverage=None, top=None, unique=False, pairs=False):
+    """
+    Generate lines for a game from its historical frequency, without prompting or printing.
+    - coverage: 2 or 3 to spread the lines over number pairs / triples (see generation.cover_lines).
+    - top: Only use the 'top' most frequent main numbers.
+    - unique: Never repeat a weighted line.
+    - pairs: Weighted lines favour numbers often drawn together (see cooccurrence).
+    Raises ValueError if the history is empty or deterministic selection can't make that many lines.
+    """
+    if unique and not pairs and not deterministic and not coverage:
+        return list(iter_game_lines(game, lines_to_generate, seed, report, top))
+    main_sorted, main_weights, supp_sorted, supp_weights = _game_pools(game, lines_to_generate, report, top)
+    max_possible_lines = max_deterministic_lines(game, main_sorted, supp_sorted)
+    if deterministic and not coverage and lines_to_generate > max_possible_lines:
+        raise ValueError(f"Cannot generate {lines_to_generate} lines without repeating numbers. "
+                         f"Maximum lines that can be generated without repetition: {max_possible_lines}")
+    
+    return generate_lines(
+        main_count=game["main_count"],
+        supp_count=game["supp_count"],
+        pool_main=main_sorted,
+        pool_supp=supp_sorted,
+        lines_to_generate=lines_to_generate,
+        main_weights=main_weights,
+        supp_weights=supp_weights,
+        deterministic=deterministic,
+        seed=seed,
+        coverage=coverage,
+        pair_lift=cooccurrence_index(game).pair_lift() if pairs else None
+    )
+
+def iter_game_lines(game, lines_to_generate, seed=None, report=None, top=None):
+    """
+    Yield unique weighted lines for a game one at a time (see generation.iter_unique_lines),
+    so millions of lines can be written out without holding them in memory.
+    Raises ValueError like generate_game_lines before the first line, or while
+    iterating if skewed weights keep repeating lines.
+    """
+    main_sorted, main_weights, supp_sorted, supp_weights = _game_pools(game, lines_to_generate, report, top)
+    return iter_unique_lines(game["main_count"], game["supp_count"], main_sorted, supp_sorted,
+                             lines_to_generate, main_weights, supp_weights, seed,
+                             supp_in_key=game["user_supp_count"] > 0)
+
+def write_lines_csv(lines, game, filename="lines.csv"):
+    """
+    Write generated lines in the format checker.iter_line_masks reads back.
+    'lines' can be any iterable (e.g. iter_game_lines); each line is written as it comes.
+    Returns the number of lines written.
+    """
+    idx = 0
+    with open(filename, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        if game["supp_count"] > 0 and game["user_supp_count"] > 0:
+            writer.writerow(["Line #", "Main Numbers", "Supplementary Numbers"])
+            for idx, (m, s) in enumerate(lines, start=1):
+                main_str = " ".join(map(str, m))
+                supp_str = " ".join(map(str, s))
+                writer.writerow([idx, main_str, supp_str])
+        else:
+            # Includes games like Saturday Lotto where user does not pick supp numbers
+            writer.writerow(["Line #", "Main Numbers"])
+            for idx, (m, _) in enumerate(lines, start=1):
+                main_str = " ".join(map(str, m))
+                writer.writerow([idx, main_str])
+    return idx
+
+def save_lines(lines, game, filename="lines.csv"):
+    """
+    Write lines to a packed ticket file if 'filename' ends in .tix, else to a lines.csv style file.
+    Returns the number of lines written.
+    """
+    if filename.lower().endswith(TICKET_SUFFIX):
+        return write_ticket_file(filename, game, lines)
+    return write_lines_csv(lines, game, filename)
+
+def uniform_game_lines(game, lines_to_generate, seed=None):
+    """
+    Uniformly random unique lines for a game (frequency plays no part), drawn as random line ranks.
+    Raises ValueError if more lines are asked for than there are possible lines.
+    """
+    codec = GameCodec(game)
+    if lines_to_generate <= 0:
+        raise ValueError("Number of lines must be greater than 0.")
+    if lines_to_generate > codec.total:
+        raise ValueError(f"Cannot generate {lines_to_generate} unique lines: only {codec.total} are possible.")
+    return codec.random_lines(lines_to_generate, seed)
+
+def check_lines(game, lines, winning_main, winning_supp=()):
+    """
+    Tally (main_matches, supp_matches) for (main, supp) lines against one set of winning numbers.
+    Returns a Counter, same as the summary printed by check_ticket_mode.
+    """
+    return match_summary(game, ((numbers_mask(m), numbers_mask(s)) for m, s in lines),
+                         winning_main, winning_supp)
+
+def backtest(game, test_draws=100, lines_per_draw=5, deterministic=False, seed=None):
+    """
+    Walk forward through the most recent 'test_draws' draws. For each one,
+    rank numbers by frequency over the earlier draws only, generate
+    'lines_per_draw' lines and score them against that draw's result.
+    Returns a dict with "draws" tested, "lines" scored and "summary", a
+    Counter keyed by (main_matches, supp_matches).
+    For several strategies and seeds in parallel use backtesting.run_backtest.
+    """
+    strategy = "deterministic" if deterministic else "weighted"
+    result = run_backtest(game, [strategy], seeds=1, test_draws=test_draws,
+                          lines_per_draw=lines_per_draw, workers=1, base_seed=seed)[strategy]
+    return {"draws": result["draws"], "lines": result["lines"], "summary": result["summary"]}
 
 def check_ticket_mode(games):
     from collections import Counter
@@ -248,11 +397,16 @@ def check_ticket_mode(games):
     # Let the user choose between reading ticket lines from CSV or manual input
     from_csv = input("Do you want to read your ticket lines from a CSV file? (y/n): ").strip().lower()
     if from_csv == 'y':
-        csv_filename = input("Enter the CSV filename containing your ticket lines: ").strip()
-        user_lines = read_user_lines_from_csv(csv_filename, game)
-        if not user_lines:
-            print("No valid ticket lines read from CSV. Aborting.")
+        csv_filename = input("Enter the CSV (or .tix ticket) filename containing your ticket lines: ").strip()
+        if not os.path.isfile(csv_filename):
+            print(f"File {csv_filename} not found.")
+            return
+        against_history = input("Check these lines against every past draw instead of one set of winning numbers? (y/n): ").strip().lower()
+        if against_history == 'y':
+            history_check(game, csv_filename)
             return
+        # Lines are streamed from the file once the winning numbers are known
+        user_lines = None
     else:
         lines_count = get_integer_input("How many lines do you have on your ticket? ")
         if lines_count <= 0:
@@ -299,6 +453,22 @@ def check_ticket_mode(games):
     if supp_count > 0:
         winning_supp = get_unique_numbers("Winning supplementary number", supp_count)
     
+    if user_lines is None:
+        # Bulk check straight from the file, summary only
+        try:
+            match_counter, lines_checked, rows_skipped = check_lines_file(
+                csv_filename, game, winning_main, winning_supp)
+        except Exception as e:
+            print(f"An error occurred while reading {csv_filename}: {e}")
+            return
+        if not lines_checked:
+            print("No valid ticket lines read from CSV. Aborting.")
+            return
+        print(f"\nChecked {lines_checked} line(s) from {csv_filename}"
+              + (f" ({rows_skipped} invalid row(s) skipped)." if rows_skipped else "."))
+        print_match_summary(match_counter, game)
+        return
+    
     # Tally matches
     match_counter = Counter()
     
@@ -306,24 +476,59 @@ def check_ticket_mode(games):
     for i, line in enumerate(user_lines, start=1):
         main_matches = len(set(line["main"]).intersection(winning_main))
         supp_matches = 0
-        if user_supp_count > 0:
-            supp_matches = len(set(line["supp"]).intersection(winning_supp))
-            print(f"Line {i}: {main_matches} main matches, {supp_matches} supplementary matches")
-            match_counter[(main_matches, supp_matches)] += 1
-        elif supp_count > 0:
-            # For games like Saturday Lotto where user does not pick supp numbers
-            supp_matches = len(set(line["main"]).intersection(winning_supp))
+        if supp_count > 0:
+            # Supplementaries drawn from the main barrel count against the main numbers
+            # (Saturday Lotto, Oz Lotto, Set for Life); a Powerball against the one picked
+            picked = line["main"] if game["supp_balls"] is None else line["supp"]
+            supp_matches = len(set(picked).intersection(winning_supp))
             print(f"Line {i}: {main_matches} main matches, {supp_matches} supplementary matches")
             match_counter[(main_matches, supp_matches)] += 1
         else:
             print(f"Line {i}: {main_matches} main matches")
             match_counter[(main_matches, 0)] += 1
     
-    # Print summary
+    print_match_summary(match_counter, game)
+
+def history_check(game, csv_filename):
+    """Check every line of a ticket CSV against the game's full draw history and report hit histograms."""
+    try:
+        line_masks = list(iter_line_masks(csv_filename, game))
+        if not line_masks:
+            print("No valid ticket lines read from CSV. Aborting.")
+            return
+        per_line, overall, num_draws = check_lines_against_history(game, line_masks)
+    except Exception as e:
+        print(f"An error occurred while checking {csv_filename}: {e}")
+        return
+    
+    print(f"\nChecked {len(line_masks)} line(s) against {num_draws} past {game['name']} draws.")
+    print("Each ticket counted below is one line in one past draw.")
+    print_match_summary(overall, game)
+    
+    save_csv = input("Do you want to save the per-line results to history-check.csv? (y/n): ").strip().lower()
+    if save_csv == 'y':
+        outcomes = sorted(overall)
+        with open("history-check.csv", "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["Line #", "Main Numbers", "Supplementary Numbers"]
+                            + [f"{m} main + {s} supp" for m, s in outcomes])
+            for idx, ((main_mask, supp_mask), histogram) in enumerate(zip(line_masks, per_line), start=1):
+                writer.writerow([idx,
+                                 " ".join(map(str, mask_numbers(main_mask))),
+                                 " ".join(map(str, mask_numbers(supp_mask)))]
+                                + [histogram[outcome] for outcome in outcomes])
+        print("Per-line results saved to history-check.csv.")
+
+def print_match_summary(match_counter, game):
     print("\nSummary of matches across all lines:")
-    if user_supp_count > 0 or supp_count > 0:
+    # Supplementary matches follow the prize rules (see checker.prize_matches)
+    width, divisions = division_table(game)
+    if game["user_supp_count"] > 0 or game["supp_count"] > 0:
         for (m_matches, s_matches), count in sorted(match_counter.items()):
-            print(f"{count} ticket(s) had {m_matches} main matches and {s_matches} supplementary matches")
+            index = m_matches * width + s_matches
+            division = divisions[index] if index < len(divisions) else 0
+            won = f" (Division {division})" if division else ""
+            print(f"{count} ticket(s) had {m_matches} main matches and {s_matches} supplementary matches{won}")
     else:
         for (m_matches, _), count in sorted(match_counter.items()):
             print(f"{count} ticket(s) had {m_matches} main matches")
@@ -340,26 +545,17 @@ def upcoming_game_mode(games):
         return
     
     game = games[choice]
-    main_count = game["main_count"]
     supp_count = game["supp_count"]
-    user_supp_count = game["user_supp_count"]
     
     # Load historical data
-    main_numbers, supp_numbers = load_historical_data(game["file"], main_count, supp_count)
-    if not main_numbers:
+    report = weighting_mode(game)
+    if report is None:
+        return
+    if not report["main"]:
         print("No main numbers loaded. Check CSV formatting.")
         return
     
-    main_frequency = Counter(main_numbers)
-    main_sorted = [num for num, freq in main_frequency.most_common()]
-    main_weights = [main_frequency[num] for num in main_sorted]
-    
-    supp_sorted = []
-    supp_weights = []
-    if supp_count > 0 and supp_numbers:
-        supp_frequency = Counter(supp_numbers)
-        supp_sorted = [num for num, freq in supp_frequency.most_common()]
-        supp_weights = [supp_frequency[num] for num in supp_sorted]
+    main_sorted, _, supp_sorted, _ = frequency_pools(report)
     
     lines_to_generate = get_integer_input("How many lines would you like to generate based on historical frequency? ")
     if lines_to_generate <= 0:
@@ -367,12 +563,7 @@ def upcoming_game_mode(games):
         return
 
     # Check if deterministic mode is feasible
-    if lines_to_generate > 0:
-        max_main_lines = len(main_sorted) // main_count
-        max_supp_lines = len(supp_sorted) // supp_count if supp_count > 0 else float('inf')
-        max_possible_lines = min(max_main_lines, max_supp_lines)
-    else:
-        max_possible_lines = 0
+    max_possible_lines = max_deterministic_lines(game, main_sorted, supp_sorted)
 
     while True:
         deterministic_input = input("Use deterministic selection (select top frequency numbers without repetition)? (y/n): ").strip().lower()
@@ -387,17 +578,44 @@ def upcoming_game_mode(games):
         print(f"Maximum lines that can be generated without repetition: {max_possible_lines}")
         return
 
-    # Generate lines
-    lines = generate_lines(
-        main_count=main_count,
-        supp_count=supp_count,
-        pool_main=main_sorted,
-        pool_supp=supp_sorted,
-        lines_to_generate=lines_to_generate,
-        main_weights=main_weights,
-        supp_weights=supp_weights,
-        deterministic=deterministic
-    )
+    coverage = None
+    if not deterministic:
+        while True:
+            cover_input = input("Spread the lines to cover number pairs or triples? (n/2/3): ").strip().lower()
+            if cover_input in ['n', '2', '3']:
+                coverage = None if cover_input == 'n' else int(cover_input)
+                break
+            else:
+                print("Please enter 'n', '2' or '3'.")
+
+    weighted = not deterministic and not coverage
+    pairs = False
+    if weighted:
+        while True:
+            pairs_input = input("Favour numbers that are often drawn together? (y/n): ").strip().lower()
+            if pairs_input in ['y', 'n']:
+                pairs = (pairs_input == 'y')
+                break
+            else:
+                print("Please enter 'y' or 'n'.")
+    if weighted and not pairs and lines_to_generate > STREAM_LINES:
+        stream_input = input(f"Write the {lines_to_generate} lines straight to lines.csv without printing them? (y/n): ").strip().lower()
+        if stream_input == 'y':
+            try:
+                written = write_lines_csv(iter_game_lines(game, lines_to_generate, report=report), game)
+            except ValueError as e:
+                print(e)
+                return
+            print(f"{written} unique lines saved to lines.csv.")
+            return
+
+    # Generate lines (plain weighted lines are never repeated)
+    try:
+        lines = generate_game_lines(game, lines_to_generate, deterministic, report=report,
+                                    coverage=coverage, unique=weighted, pairs=pairs)
+    except ValueError as e:
+        print(e)
+        return
     
     if lines:
         print(f"\nGenerated {lines_to_generate} lines for {game['name']} based on frequency:")
@@ -410,29 +628,51 @@ def upcoming_game_mode(games):
         # Option to save to CSV
         save_csv = input("Do you want to save these lines to lines.csv? (y/n): ").strip().lower()
         if save_csv == 'y':
-            with open("lines.csv", "w", newline="", encoding="utf-8") as f:
-                writer = csv.writer(f)
-                if supp_count > 0 and user_supp_count > 0:
-                    writer.writerow(["Line #", "Main Numbers", "Supplementary Numbers"])
-                    for idx, (m, s) in enumerate(lines, start=1):
-                        main_str = " ".join(map(str, m))
-                        supp_str = " ".join(map(str, s))
-                        writer.writerow([idx, main_str, supp_str])
-                elif supp_count > 0 and user_supp_count == 0:
-                    # For games like Saturday Lotto where user does not pick supp numbers
-                    writer.writerow(["Line #", "Main Numbers"])
-                    for idx, (m, _) in enumerate(lines, start=1):
-                        main_str = " ".join(map(str, m))
-                        writer.writerow([idx, main_str])
-                else:
-                    writer.writerow(["Line #", "Main Numbers"])
-                    for idx, (m, _) in enumerate(lines, start=1):
-                        main_str = " ".join(map(str, m))
-                        writer.writerow([idx, main_str])
+            write_lines_csv(lines, game)
             print("Lines saved to lines.csv.")
     else:
         print("No lines were generated due to insufficient data.")
 
+def weighting_mode(game):
+    # Ask how past draws should be weighted; returns the frequency report to generate from (None if cancelled)
+    print("How should past draws be weighted?")
+    print("1. Every draw counts the same")
+    print("2. Recent draws count more")
+    print("3. Only the most recent draws")
+    print("4. Only draws between two dates")
+    scheme = input("Enter 1, 2, 3, or 4: ").strip()
+    
+    if scheme == "1":
+        return frequency_report(game)
+    try:
+        if scheme == "2":
+            half_life = get_integer_input("After how many draws should a draw count half as much? ")
+            report = weighted_frequency_report(game, half_life=half_life)
+        elif scheme == "3":
+            window = get_integer_input("How many of the most recent draws? ")
+            report = weighted_frequency_report(game, window=window)
+        elif scheme == "4":
+            dates = []
+            for prompt in ("From date (dd/mm/yyyy, blank for the first draw): ",
+                           "To date (dd/mm/yyyy, blank for the latest draw): "):
+                text = input(prompt).strip()
+                day = parse_date_arg(text) if text else None
+                if text and day is None:
+                    print(f"Invalid date '{text}'.")
+                    return None
+                dates.append(day)
+            report = weighted_frequency_report(game, since=dates[0], until=dates[1])
+        else:
+            print("Invalid choice.")
+            return None
+    except ValueError as e:
+        print(e)
+        return None
+    if os.path.isfile(game["file"]) and not report["draws"]:
+        print("No draws fall within that date range.")
+        return None
+    return report
+
 def frequency_view_mode(games):
     print("Choose a game to view frequency:")
     for key, g in games.items():
@@ -444,69 +684,573 @@ def frequency_view_mode(games):
         return
     
     game = games[choice]
-    main_count = game["main_count"]
     supp_count = game["supp_count"]
     
-    main_numbers, supp_numbers = load_historical_data(game["file"], main_count, supp_count)
-    if not main_numbers:
+    report = frequency_report(game)
+    if not report["main"]:
         print("No data loaded. Check CSV formatting.")
         return
     
-    main_frequency = Counter(main_numbers)
-    num_draws = len(main_numbers) // main_count
+    num_draws = report["draws"]
     print(f"\nFrequency of main numbers for {game['name']}:")
-    for num, freq in main_frequency.most_common():
+    for num, freq in report["main"]:
         percentage = (freq / num_draws) * 100
         print(f"Number {num}: drawn in {freq}/{num_draws} draws = {percentage:.2f}%")
     
-    if supp_count > 0 and supp_numbers:
-        supp_frequency = Counter(supp_numbers)
-        num_draws_supp = len(supp_numbers) // supp_count
+    if supp_count > 0 and report["supp"]:
+        num_draws_supp = report["supp_draws"]
         print(f"\nFrequency of supplementary numbers for {game['name']}:")
-        for num, freq in supp_frequency.most_common():
+        for num, freq in report["supp"]:
             percentage = (freq / num_draws_supp) * 100
             print(f"Number {num}: drawn in {freq}/{num_draws_supp} draws = {percentage:.2f}%")
+    
+    pairs = cooccurrence_report(game, TOP_COMBINATIONS)
+    if pairs["pairs"]:
+        print(f"\nMain numbers most often drawn together in {game['name']}:")
+        print_cooccurrence(pairs)
 
-def main():
-    # Define games and their configurations
-    games = {
-        "1": {
-            "name": "Saturday Lotto",
-            "file": "saturday-lotto.csv",
-            "main_count": 6,
-            "supp_count": 2,
-            "user_supp_count": 0  # Users do not pick supplementary numbers
-        },
-        "2": {
-            "name": "Oz Lotto",
-            "file": "oz-lotto.csv",
-            "main_count": 7,
-            "supp_count": 3,
-            "user_supp_count": 3  # Users pick supplementary numbers
-        },
-        "3": {
-            "name": "Powerball",
-            "file": "powerball.csv",
-            "main_count": 7,
-            "supp_count": 1,
-            "user_supp_count": 1  # Users pick supplementary numbers (Powerball)
-        },
-        "4": {
-            "name": "Set for Life",
-            "file": "set-for-life.csv",
-            "main_count": 7,
-            "supp_count": 2,
-            "user_supp_count": 2  # Users pick supplementary numbers
-        }
+def cooccurrence_index(game):
+    """
+    The game's cooccurrence.CooccurrenceIndex, kept for the rest of the session
+    like frequency reports (see clear_session_cache).
+    """
+    key = ("cooccurrence", game["file"])
+    index = _session_cache.get(key)
+    if index is None:
+        index = _session_cache[key] = CooccurrenceIndex.for_game(game)
+    return index
+
+def cooccurrence_report(game, top=10, window=None, number=None, triples=True):
+    """
+    Most common main number pairs (and triples) for a game, without printing.
+    Returns a dict with "draws" counted, "pairs" and "triples" as lists of
+    (numbers, times drawn together), and with 'number' given, "partners":
+    (number, times drawn with it), most often first.
+    """
+    report = {"draws": 0, "pairs": [], "triples": []}
+    try:
+        index = cooccurrence_index(game)
+    except FileNotFoundError:
+        print(f"File {game['file']} not found.")
+        return report
+    report["draws"] = index.draws(window)
+    report["pairs"] = index.top_pairs(top, window)
+    if triples:
+        report["triples"] = index.top_triples(top, window)
+    if number is not None:
+        report["number"] = number
+        report["partners"] = index.partners(number, top, window)
+    return report
+
+def print_cooccurrence(report):
+    num_draws = report["draws"]
+    for label in ("pairs", "triples"):
+        if report[label]:
+            print(f"Top {label}:")
+        for numbers, count in report[label]:
+            print(f"{' & '.join(map(str, numbers))}: together in {count}/{num_draws} draws")
+    if "partners" in report:
+        print(f"Drawn most often with {report['number']}:")
+        for num, count in report["partners"]:
+            print(f"{num}: together in {count}/{num_draws} draws")
+
+def game_summary(game, top=5):
+    """
+    Headline figures for one game, without printing: draws and date range,
+    the 'top' most and least drawn main numbers, the most common pairs and
+    Division 1 jackpot trend. Also returns the full "frequency" report.
+    Runs in a worker process for all_games_report, so everything returned is plain data.
+    """
+    report = frequency_report(game)
+    columns = load_columns(game["file"], game["main_count"], game["supp_count"])
+    dates = [d for d in columns.draw_date.tolist() if d]
+    jackpots = jackpot_rollovers(load_prize_history(game))
+    return {
+        "game": game["name"],
+        "draws": report["draws"],
+        "first_date": _yyyymmdd(min(dates)) if dates else None,
+        "last_date": _yyyymmdd(max(dates)) if dates else None,
+        "hot": report["main"][:top],
+        "cold": report["main"][::-1][:top],
+        "pairs": cooccurrence_report(game, top, triples=False)["pairs"],
+        "jackpots": {key: jackpots[key] for key in ("draws", "jackpots", "rollover_rate",
+                                                    "longest_run", "current_run")},
+        "frequency": report,
     }
+
+def _yyyymmdd(value):
+    return f"{value % 100:02d}/{value // 100 % 100:02d}/{value // 10000}"
+
+def all_games_report(games=GAMES, workers=None):
+    """
+    game_summary for every game, worked out in parallel (one process per game
+    by default; 1 runs in this process). Each game's frequency report and
+    co-occurrence index come back from the workers and are kept for the
+    session, so the frequency view and generation from all-time frequencies
+    (pair weighted or not) don't touch the CSVs again. Recency weighting and
+    history checks still read their own caches (see weighting, checker).
+    Returns a list of summaries in menu order; a game whose CSV can't be read
+    is reported as {"game": name, "error": message}.
+    """
+    games = list(games.values()) if isinstance(games, dict) else list(games)
+    if workers is None:
+        workers = min(len(games), os.cpu_count() or 1)
+    parallel = workers > 1 and len(games) > 1
+    
+    summaries = []
+    with ProcessPoolExecutor(max_workers=workers) if parallel else nullcontext() as pool:
+        futures = [pool.submit(_summarise_game, game) for game in games] if parallel else None
+        for i, game in enumerate(games):
+            try:
+                summary, index = futures[i].result() if futures else _summarise_game(game)
+            except (OSError, ValueError) as e:
+                summaries.append({"game": game["name"], "error": str(e)})
+                continue
+            if summary["frequency"]["main"]:
+                _session_cache[("frequency", game["file"], None)] = summary["frequency"]
+            _session_cache[("cooccurrence", game["file"])] = index
+            summaries.append(summary)
+    return summaries
+
+def _summarise_game(game):
+    # all_games_report's worker: the summary plus the co-occurrence index behind its pairs
+    return game_summary(game), cooccurrence_index(game)
+
+def print_all_games_report(summaries):
+    for summary in summaries:
+        print(f"\n{summary['game']}")
+        if "error" in summary:
+            print(f"Could not be analysed: {summary['error']}")
+            continue
+        print(f"{summary['draws']} draws from {summary['first_date']} to {summary['last_date']}")
+        print("Most drawn: " + ", ".join(f"{num} ({freq})" for num, freq in summary["hot"]))
+        print("Least drawn: " + ", ".join(f"{num} ({freq})" for num, freq in summary["cold"]))
+        print("Most common pairs: " + ", ".join(f"{a} & {b} ({count})" for (a, b), count in summary["pairs"]))
+        jackpots = summary["jackpots"]
+        if jackpots["draws"]:
+            print(f"Division 1 rolled over in {jackpots['rollover_rate'] * 100:.1f}% of "
+                  f"{jackpots['draws']} draws; longest run {jackpots['longest_run']}, "
+                  f"current run {jackpots['current_run']}")
+
+def all_games_mode(games):
+    print("\nAnalysing all games...")
+    print_all_games_report(all_games_report(games))
+
+def summary_rows(match_counter):
+    """Counter keyed by (main_matches, supp_matches) -> list of dicts, for JSON output."""
+    return [{"main_matches": m, "supp_matches": s, "count": count}
+            for (m, s), count in sorted(match_counter.items())]
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Lottery number frequency, line generation and ticket checking. "
+                    "Run without arguments for the interactive menu.")
+    parser.add_argument("--profile", action="store_true",
+                        help="Print the time spent per stage to stderr (or set LOTTO_PROFILE=1)")
+    parser.add_argument("--profile-dir", metavar="DIR",
+                        help="Also write a cProfile dump per stage to DIR (or set LOTTO_PROFILE_DIR)")
+    game_names = ", ".join(os.path.splitext(g["file"])[0] for g in GAMES.values())
+    
+    def game_arg(value):
+        game = find_game(value)
+        if game is None:
+            raise argparse.ArgumentTypeError(f"unknown game '{value}' (choose from {game_names})")
+        return game
+    
+    def window_arg(value):
+        try:
+            window = int(value)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid window '{value}'")
+        if window < 1:
+            raise argparse.ArgumentTypeError("the window must be at least one draw")
+        return window
+    
+    def date_arg(value):
+        day = parse_date_arg(value)
+        if day is None:
+            raise argparse.ArgumentTypeError(f"invalid date '{value}' (use dd/mm/yyyy or yyyy-mm-dd)")
+        return day
+    
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    freq = subparsers.add_parser("frequency", help="Frequency of each number for a game")
+    freq.add_argument("game", type=game_arg, help=f"Game: {game_names}, or its menu number")
+    freq.add_argument("--window", type=window_arg, help="Only count the most recent N draws")
+    freq.add_argument("--json", action="store_true", help="Print JSON instead of text")
+    
+    gen = subparsers.add_parser("generate", help="Generate lines from historical frequency")
+    gen.add_argument("game", type=game_arg, help=f"Game: {game_names}, or its menu number")
+    gen.add_argument("-n", "--lines", type=int, default=5, help="Number of lines (default 5)")
+    gen_mode = gen.add_mutually_exclusive_group()
+    gen_mode.add_argument("--deterministic", action="store_true",
+                          help="Pick top frequency numbers without repetition")
+    gen_mode.add_argument("--cover", type=int, choices=(2, 3),
+                          help="Spread lines to cover as many number pairs (2) or triples (3) as possible")
+    gen_mode.add_argument("--unique", action="store_true",
+                          help="Never repeat a line; with -o, lines are streamed to the file instead of printed")
+    gen_mode.add_argument("--uniform", action="store_true",
+                          help="Uniformly random unique lines, ignoring frequency")
+    gen.add_argument("--top", type=int, help="Only use the N most frequent main numbers")
+    gen.add_argument("--pairs", action="store_true",
+                     help="Weighted lines favour numbers often drawn together")
+    gen.add_argument("--half-life", type=float,
+                     help="Weight draws by recency: a draw counts half as much after this many newer draws")
+    gen.add_argument("--window", type=window_arg, help="Only weight numbers by the most recent N draws")
+    gen.add_argument("--since", type=date_arg, help="Only weight numbers by draws from this date (dd/mm/yyyy)")
+    gen.add_argument("--until", type=date_arg, help="Only weight numbers by draws up to this date (dd/mm/yyyy)")
+    gen.add_argument("--seed", type=int, help="Seed for reproducible weighted sampling")
+    gen.add_argument("-o", "--output",
+                     help="Also write the lines to this file (CSV, or a packed ticket file if it ends in .tix)")
+    gen.add_argument("--json", action="store_true", help="Print JSON instead of text")
+    
+    pairs = subparsers.add_parser("pairs", help="Main numbers most often drawn together")
+    pairs.add_argument("game", type=game_arg, help=f"Game: {game_names}, or its menu number")
+    pairs.add_argument("--top", type=int, default=10, help="How many to list (default 10)")
+    pairs.add_argument("--window", type=window_arg, help="Only count the most recent N draws")
+    pairs.add_argument("--with", dest="number", type=int, help="Numbers most often drawn with this one")
+    pairs.add_argument("--triples", action="store_true", help="Also list triples")
+    pairs.add_argument("--json", action="store_true", help="Print JSON instead of text")
+    
+    every = subparsers.add_parser("all", help="Combined report over every game, analysed in parallel")
+    every.add_argument("--workers", type=int, help="Worker processes (default one per game)")
+    every.add_argument("--json", action="store_true", help="Print JSON instead of text")
+    
+    check = subparsers.add_parser("check", help="Check a ticket CSV against winning numbers or all past draws")
+    check.add_argument("game", type=game_arg, help=f"Game: {game_names}, or its menu number")
+    check.add_argument("--lines", required=True, help="Ticket lines: CSV (lines.csv format) or a .tix ticket file")
+    target = check.add_mutually_exclusive_group(required=True)
+    target.add_argument("--main", type=int, nargs="+", help="Winning main numbers")
+    target.add_argument("--history", action="store_true", help="Check against every past draw instead")
+    check.add_argument("--supp", type=int, nargs="*", default=[], help="Winning supplementary numbers")
+    check.add_argument("--json", action="store_true", help="Print JSON instead of text")
+    
+    back = subparsers.add_parser("backtest", help="Score generation strategies against past draws")
+    back.add_argument("game", type=game_arg, help=f"Game: {game_names}, or its menu number")
+    back.add_argument("--draws", type=int, default=100, help="How many recent draws to test (default 100)")
+    back.add_argument("-n", "--lines", type=int, default=5, help="Lines generated per draw (default 5)")
+    back.add_argument("--strategy", choices=STRATEGIES + ("all",), default="all",
+                      help="Generation strategy to test (default all)")
+    back.add_argument("--seeds", type=int, default=10, help="Random runs per strategy (default 10)")
+    back.add_argument("--workers", type=int, help="Worker processes (default one per core)")
+    back.add_argument("--seed", type=int, help="Seed for a reproducible backtest")
+    back.add_argument("--json", action="store_true", help="Print JSON instead of text")
+    
+    prize = subparsers.add_parser("prizes", help="Dividends, jackpot rollovers and expected value per line")
+    prize.add_argument("game", type=lambda value: None if value.lower() == "all" else game_arg(value),
+                       help=f"Game: {game_names}, its menu number, or 'all'")
+    prize.add_argument("--no-ev", dest="expected_values", action="store_false",
+                       help="Skip the expected value backtest")
+    prize.add_argument("--draws", type=int, default=100,
+                       help="Recent draws to price strategies over (default 100)")
+    prize.add_argument("-n", "--lines", type=int, default=5, help="Lines generated per draw (default 5)")
+    prize.add_argument("--seeds", type=int, default=10, help="Random runs per strategy (default 10)")
+    prize.add_argument("--workers", type=int, help="Worker processes (default one per core)")
+    prize.add_argument("--seed", type=int, help="Seed for a reproducible backtest")
+    prize.add_argument("--json", action="store_true", help="Print JSON instead of text")
+    
+    rand = subparsers.add_parser("randomness", help="Statistical tests of whether past draws look random")
+    rand.add_argument("game", type=lambda value: None if value.lower() == "all" else game_arg(value),
+                      help=f"Game: {game_names}, its menu number, or 'all'")
+    rand.add_argument("--resamples", type=int, default=1000,
+                      help="Bootstrap resamples for the pair and serial tests (default 1000, 0 to skip)")
+    rand.add_argument("--workers", type=int, help="Worker processes (default one per core)")
+    rand.add_argument("--seed", type=int, help="Seed for reproducible resampled p-values")
+    rand.add_argument("--json", action="store_true", help="Print JSON instead of text")
+    
+    odds = subparsers.add_parser("odds", help="Exact odds of each prize division, for standard or system entries")
+    odds.add_argument("game", type=lambda value: None if value.lower() == "all" else game_arg(value),
+                      help=f"Game: {game_names}, its menu number, or 'all'")
+    odds.add_argument("--picks", type=int, help="Main numbers on a system entry (default a standard line)")
+    odds.add_argument("--supp-picks", type=int, help="Powerball numbers picked (e.g. 20 for every Powerball)")
+    odds.add_argument("--no-ev", dest="expected_value", action="store_false",
+                      help="Skip the expected prize money at average past dividends")
+    odds.add_argument("--json", action="store_true", help="Print JSON instead of text")
+    
+    serve = subparsers.add_parser("serve", help="Serve frequency, generation and checks over HTTP/JSON")
+    serve.add_argument("--host", default="127.0.0.1", help="Address to listen on (default 127.0.0.1)")
+    serve.add_argument("--port", type=int, default=8000, help="Port to listen on (default 8000)")
+    serve.add_argument("--workers", type=int, help="Worker processes for batch work (default one per core)")
+    serve.add_argument("--poll", type=float, default=2.0, help="Seconds between checks for changed CSVs (default 2)")
+    return parser
+
+def print_prize_report(report):
+    print(f"\n{report['game']}: {report['draws']} draws")
+    for entry in report["dividends"]:
+        if entry["mean"] is None:
+            print(f"Division {entry['division']}: never won")
+            continue
+        print(f"Division {entry['division']}: won in {entry['draws']} draws, "
+              f"{entry['mean_winners']:.1f} winners on average, paid ${entry['min']:,.2f}-${entry['max']:,.2f} "
+              f"(median ${entry['median']:,.2f}, mean ${entry['mean']:,.2f})")
+    jackpots = report["jackpots"]
+    if jackpots["draws"]:
+        mean_run = f"{jackpots['mean_run']:.1f}" if jackpots["mean_run"] is not None else "n/a"
+        print(f"Division 1 won in {jackpots['jackpots']}/{jackpots['draws']} draws "
+              f"({jackpots['rollover_rate'] * 100:.1f}% rolled over); longest rollover run "
+              f"{jackpots['longest_run']}, average {mean_run}, current {jackpots['current_run']}")
+    for strategy, result in report.get("expected_values", {}).items():
+        if result["ev_per_line"] is None:
+            print(f"{strategy}: no lines could be scored")
+        else:
+            print(f"{strategy}: ${result['ev_per_line']:.4f} won per line over the last {result['draws']} "
+                  f"draws ({result['lines']} line(s), {result['runs']} run(s))")
+
+def print_randomness_report(report):
+    print(f"\n{report['game']}: {report['draws']} draws of {report['balls']} balls")
+    for test in report["tests"]:
+        p_value = test["p_value"]
+        verdict = "n/a" if p_value is None else f"p = {p_value:.4f}" + (" *" if p_value < SIGNIFICANCE else "")
+        name = test["test"]
+        if name == "uniformity":
+            deviant = ", ".join(f"{ball} ({count} vs {expected})" for ball, count, expected in test["most_deviant"])
+            detail = f"chi-square {test['statistic']:.1f} on {test['df']} df; furthest from expected: {deviant}"
+        elif name == "runs":
+            detail = (f"{len(test['flagged'])} ball(s) with unusual runs at the {SIGNIFICANCE:.0%} level "
+                      f"(about {test['expected_flagged']} expected by chance); ")
+            if test["resamples"]:
+                detail += (f"p over {test['resamples']} random histories "
+                           f"(chi-square approximation {test['approximate_p_value']:.4f})")
+            else:
+                detail += "approximate p: the balls' runs aren't independent"
+        elif name == "gaps":
+            detail = f"chi-square {test['statistic']:.1f} on {test['df']} df over {test['bins']} gap lengths"
+        elif name == "pairs":
+            resampled = test.get("resampled_p_value")
+            detail = f"chi-square {test['statistic']:.1f} on {test['df']} df"
+            if resampled is not None:
+                detail += f", p = {resampled:.4f} over {test['resamples']} random histories"
+        else:
+            detail = (f"{test['statistic']} numbers repeated from the previous draw "
+                      f"({test['expected']:.1f} expected, {test['resamples']} shuffles)")
+        print(f"{name}: {verdict}; {detail}")
+
+def game_odds(game, picks=None, supp_picks=None, expected_value=True):
+    """
+    Exact odds of each division for a standard or system entry (see odds.odds_report).
+    With 'expected_value', also the prize money it wins on average, at the
+    mean dividend each division has paid in the CSV.
+    Raises ValueError for an entry the game doesn't allow.
+    """
+    amounts = None
+    if expected_value and os.path.isfile(game["file"]):
+        amounts = [entry["mean"] or 0.0 for entry in dividend_distribution(load_prize_history(game))]
+    return odds_report(game, picks, supp_picks, amounts)
+
+def print_odds_report(report):
+    if report["lines"] == 1:
+        entry = "standard entry"
+    else:
+        supp = f" and {report['supp_picks']} supplementary numbers" if report["supp_picks"] else ""
+        entry = f"entry of {report['picks']} numbers{supp} ({report['lines']} lines)"
+    print(f"\n{report['game']}, {entry}: wins a prize 1 in {report['win_one_in']:,.2f}")
+    for division in report["divisions"]:
+        outcomes = ", ".join(f"{m}+{s}" if s else f"{m}" for m, s in division["outcomes"])
+        odds_text = f"1 in {division['one_in']:,.0f}" if division["one_in"] else "impossible"
+        wins = f", {division['expected_wins']:.3g} winning lines expected" if report["lines"] > 1 else ""
+        print(f"Division {division['division']} ({outcomes}): {odds_text}{wins}")
+    if report["expected_value"] is not None:
+        print(f"Expected prize money per entry at average dividends: ${report['expected_value']:.4f}")
+
+def run_command(args):
+    """Run a parsed command line. Returns the process exit status."""
+    if args.command == "serve":
+        from server import serve  # server.py builds on this module
+        serve(args.host, args.port, args.workers, args.poll)
+        return 0
+    
+    if args.command == "all":
+        summaries = all_games_report(GAMES, args.workers)
+        if args.json:
+            print(json.dumps([{key: value for key, value in summary.items() if key != "frequency"}
+                              for summary in summaries]))
+        else:
+            print_all_games_report(summaries)
+        return 0
+    
+    game = args.game
+    
+    if args.command == "frequency":
+        report = frequency_report(game, args.window)
+        if not report["main"]:
+            print("No data loaded. Check CSV formatting.", file=sys.stderr)
+            return 1
+        if args.json:
+            print(json.dumps({"game": game["name"], **report}))
+            return 0
+        for label, key, draws_key in (("main", "main", "draws"), ("supplementary", "supp", "supp_draws")):
+            if not report[key]:
+                continue
+            num_draws = report[draws_key]
+            print(f"Frequency of {label} numbers for {game['name']}:")
+            for num, freq in report[key]:
+                print(f"Number {num}: drawn in {freq}/{num_draws} draws = {(freq / num_draws) * 100:.2f}%")
+        return 0
+    
+    if args.command == "generate":
+        try:
+            report = None
+            if any(value is not None for value in (args.half_life, args.window, args.since, args.until)):
+                report = weighted_frequency_report(game, args.half_life, args.window, args.since, args.until)
+                if not report["draws"]:
+                    raise ValueError("No draws to weight numbers by (check the date range).")
+            if args.uniform:
+                lines = uniform_game_lines(game, args.lines, args.seed)
+            elif args.unique and not args.pairs and not args.json:
+                lines = iter_game_lines(game, args.lines, args.seed, report, args.top)
+            else:
+                lines = generate_game_lines(game, args.lines, args.deterministic, args.seed, report,
+                                            coverage=args.cover, top=args.top, unique=args.unique,
+                                            pairs=args.pairs)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 1
+        if (args.unique or args.uniform) and args.output and not args.json:
+            try:
+                written = save_lines(lines, game, args.output)
+            except ValueError as e:
+                print(e, file=sys.stderr)
+                return 1
+            print(f"Wrote {written} unique line(s) to {args.output}.")
+            return 0
+        if args.output:
+            save_lines(lines, game, args.output)
+        if args.json:
+            print(json.dumps({"game": game["name"], "lines": [{"main": m, "supp": s} for m, s in lines]}))
+        else:
+            try:
+                for idx, (m, s) in enumerate(lines, start=1):
+                    if game["supp_count"] > 0:
+                        print(f"Line {idx}: Main - {m}, Supp - {s}")
+                    else:
+                        print(f"Line {idx}: Main - {m}")
+            except ValueError as e:
+                # Unique lines are drawn as they're printed
+                print(e, file=sys.stderr)
+                return 1
+        return 0
+    
+    if args.command == "pairs":
+        report = cooccurrence_report(game, args.top, args.window, args.number, args.triples)
+        if not report["draws"]:
+            print("No data loaded. Check CSV formatting.", file=sys.stderr)
+            return 1
+        if args.json:
+            print(json.dumps({"game": game["name"], **report}))
+        else:
+            print_cooccurrence(report)
+        return 0
+    
+    if args.command == "check":
+        if not os.path.isfile(args.lines):
+            print(f"File {args.lines} not found.", file=sys.stderr)
+            return 1
+        try:
+            if args.history:
+                line_masks = list(iter_line_masks(args.lines, game))
+                per_line, summary, num_draws = check_lines_against_history(game, line_masks)
+                result = {"game": game["name"], "lines": len(line_masks), "draws": num_draws,
+                          "summary": summary_rows(summary),
+                          "per_line": [summary_rows(histogram) for histogram in per_line]}
+            else:
+                validate_winning_numbers(game, args.main, args.supp)
+                summary, lines_checked, rows_skipped = check_lines_file(args.lines, game, args.main, args.supp)
+                result = {"game": game["name"], "lines": lines_checked, "skipped": rows_skipped,
+                          "summary": summary_rows(summary)}
+        except ValueError as e:
+            # Invalid winning numbers, or e.g. a ticket file written for another game
+            print(e, file=sys.stderr)
+            return 1
+        if args.json:
+            print(json.dumps(result))
+        else:
+            against = f"{result['draws']} past draws" if args.history else "the winning numbers"
+            print(f"Checked {result['lines']} line(s) against {against}.")
+            for row in result["summary"]:
+                print(f"{row['count']} line(s) had {row['main_matches']} main matches "
+                      f"and {row['supp_matches']} supplementary matches")
+        return 0
+    
+    if args.command == "backtest":
+        strategies = STRATEGIES if args.strategy == "all" else (args.strategy,)
+        results = run_backtest(game, strategies, args.seeds, args.draws, args.lines,
+                               args.workers, args.seed)
+        if args.json:
+            print(json.dumps({"game": game["name"], "strategies": {
+                strategy: {**result, "summary": summary_rows(result["summary"])}
+                for strategy, result in results.items()}}))
+            return 0
+        for strategy, result in results.items():
+            means = result["mean_main_matches"]
+            print(f"\n{strategy}: {result['runs']} run(s) over the last {result['draws']} "
+                  f"{game['name']} draws, {result['lines']} line(s) scored")
+            if not result["lines"]:
+                print("No lines could be scored: not enough distinct numbers in the history for this strategy.")
+            if means:
+                spread = f" (runs ranged {min(means):.3f}-{max(means):.3f})" if len(means) > 1 else ""
+                print(f"Average main matches per line: {sum(means) / len(means):.3f}{spread}")
+            for (m, s), count in sorted(result["summary"].items()):
+                print(f"{count} line(s) had {m} main matches and {s} supplementary matches")
+        return 0
+    
+    if args.command == "prizes":
+        games = list(GAMES.values()) if game is None else [game]
+        reports = [prize_report(g, args.expected_values, seeds=args.seeds, test_draws=args.draws,
+                                lines_per_draw=args.lines, workers=args.workers, base_seed=args.seed)
+                   for g in games]
+        if args.json:
+            print(json.dumps(reports if game is None else reports[0]))
+        else:
+            for report in reports:
+                print_prize_report(report)
+        return 0
+    
+    if args.command == "odds":
+        games = list(GAMES.values()) if game is None else [game]
+        try:
+            reports = [game_odds(g, args.picks, args.supp_picks, args.expected_value) for g in games]
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 1
+        if args.json:
+            print(json.dumps(reports if game is None else reports[0]))
+        else:
+            for report in reports:
+                print_odds_report(report)
+        return 0
+    
+    if args.command == "randomness":
+        games = list(GAMES.values()) if game is None else [game]
+        reports = randomness_reports(games, args.resamples, args.workers, args.seed)
+        if args.json:
+            print(json.dumps(reports if game is None else reports[0]))
+        else:
+            for report in reports:
+                print_randomness_report(report)
+            print(f"\n* p-value below {SIGNIFICANCE}; with this many tests a few are expected by chance.")
+        return 0
+    
+    return 1
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv:
+        args = build_parser().parse_args(argv)
+        if args.profile or args.profile_dir:
+            instrumentation.enable(args.profile_dir)
+        return run_command(args)
+    
+    games = GAMES
     
     while True:
         print("\nDo you want to:")
         print("1. Check your ticket against winning numbers")
         print("2. Generate numbers for an upcoming game based on historical frequency")
         print("3. View frequency of each number for a chosen game")
-        print("4. Exit")
-        mode = input("Enter 1, 2, 3, or 4: ").strip()
+        print("4. Analyse all games together")
+        print("5. Exit")
+        mode = input("Enter 1, 2, 3, 4, or 5: ").strip()
         
         if mode == "1":
             check_ticket_mode(games)
@@ -515,10 +1259,12 @@ def main():
         elif mode == "3":
             frequency_view_mode(games)
         elif mode == "4":
+            all_games_mode(games)
+        elif mode == "5":
             print("Goodbye!")
             break
         else:
             print("Invalid choice.")
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,171 @@
+from fractions import Fraction
+
+# Exact odds of every prize division, for standard and system entries.
+#
+# A draw takes main_count numbers (plus supp_count supplementaries) out of
+# the barrel, so the number of the player's numbers it hits is
+# hypergeometric. An entry's picked numbers split into those drawn as main
+# numbers, those drawn as supplementaries (when they come from the same
+# barrel) and the rest; the chance of each split is a product of binomial
+# coefficients over the number of possible draws. A system entry (more than
+# main_count numbers) plays every main_count-number line of its numbers, so
+# for each split the lines winning each division are counted the same way.
+#
+# Binomial coefficients come from a Pascal's triangle that is grown on
+# demand and kept, and the odds of an entry type are worked out once per
+# (game, picks, supp picks) and kept too. Scoring a line is a lookup in the
+# flat table from division_table: table[main_matches * width + supp_matches].
+
+_pascal = [[1]]  # _pascal[n][k] = C(n, k)
+_odds = {}       # (game name, picks, supp picks) -> DivisionOdds
+
+
+def binomial(n, k):
+    """C(n, k) from the cached Pascal's triangle (0 outside 0 <= k <= n)."""
+    if k < 0 or n < 0 or k > n:
+        return 0
+    while len(_pascal) <= n:
+        row = _pascal[-1]
+        _pascal.append([1] + [row[i] + row[i + 1] for i in range(len(row) - 1)] + [1])
+    return _pascal[n][k]
+
+
+def division_table(game):
+    """
+    (width, table) where table[main_matches * width + supp_matches] is the
+    division that outcome wins (0 for none), from the game's division rules.
+    Outcomes are counted as in checker.prize_matches.
+    """
+    width = game["supp_count"] + 1
+    table = [0] * ((game["main_count"] + 1) * width)
+    for division, outcomes in enumerate(game["divisions"], start=1):
+        for main_matches, supp_matches in outcomes:
+            table[main_matches * width + supp_matches] = division
+    return width, table
+
+
+class DivisionOdds:
+    """
+    Exact chances of every prize division for one entry in a game.
+
+    - game: Entry of the games table (needs main_balls, supp_balls and divisions).
+    - picks: Main numbers on the entry: main_count for a standard line, more
+      for a system entry (which plays every main_count-number line of them).
+    - supp_picks: Powerball numbers picked, for games with a separate
+      supplementary barrel (default: the game's user_supp_count; all of the
+      barrel covers every Powerball).
+
+    Attributes, per division (division 1 first):
+    - chance: Fraction chance that at least one line of the entry wins it.
+    - expected_wins: Fraction expected number of the entry's lines winning it.
+    And:
+    - lines: Standard lines the entry covers.
+    - win_chance: Fraction chance that the entry wins any division.
+    - outcomes: {(main hits, supp hits): Fraction} over the entry's picked numbers.
+    Use DivisionOdds.for_entry(game, ...) to reuse odds already worked out.
+    """
+
+    def __init__(self, game, picks=None, supp_picks=None):
+        main_count = game["main_count"]
+        supp_count = game["supp_count"]
+        balls = game["main_balls"]
+        separate = game["supp_balls"] is not None
+        per_line_supp = game["user_supp_count"] if separate else 0
+        picks = main_count if picks is None else picks
+        supp_picks = per_line_supp if supp_picks is None or not separate else supp_picks
+        if not main_count <= picks <= balls:
+            raise ValueError(f"An entry needs {main_count} to {balls} main numbers.")
+        if separate and not per_line_supp <= supp_picks <= game["supp_balls"]:
+            raise ValueError(f"An entry needs {per_line_supp} to {game['supp_balls']} Powerball numbers.")
+
+        self.game = game
+        self.picks = picks
+        self.supp_picks = supp_picks
+        self.lines = binomial(picks, main_count) * binomial(supp_picks, per_line_supp)
+        width, table = division_table(game)
+        divisions = len(game["divisions"])
+
+        # Chance of each split of the picked numbers: m drawn as main numbers,
+        # j picked supplementaries drawn (same barrel: j more of the picks)
+        self.outcomes = {}
+        if separate:
+            main_draws = binomial(balls, main_count)
+            supp_draws = binomial(game["supp_balls"], supp_count)
+            for m in range(main_count + 1):
+                main_ways = binomial(picks, m) * binomial(balls - picks, main_count - m)
+                for j in range(supp_count + 1):
+                    supp_ways = binomial(supp_picks, j) * binomial(game["supp_balls"] - supp_picks, supp_count - j)
+                    if main_ways and supp_ways:
+                        self.outcomes[(m, j)] = Fraction(main_ways * supp_ways, main_draws * supp_draws)
+        else:
+            draws = binomial(balls, main_count) * binomial(balls - main_count, supp_count)
+            for m in range(main_count + 1):
+                main_ways = binomial(picks, m) * binomial(balls - picks, main_count - m)
+                for j in range(supp_count + 1):
+                    supp_ways = binomial(picks - m, j) * binomial(balls - picks - (main_count - m), supp_count - j)
+                    if main_ways and supp_ways:
+                        self.outcomes[(m, j)] = Fraction(main_ways * supp_ways, draws)
+
+        self.chance = [Fraction(0)] * divisions
+        self.expected_wins = [Fraction(0)] * divisions
+        self.win_chance = Fraction(0)
+        for (m, j), probability in self.outcomes.items():
+            wins = [0] * (divisions + 1)
+            for line_m in range(min(m, main_count) + 1):
+                for line_j in range(supp_count + 1):
+                    division = table[line_m * width + line_j]
+                    if not division:
+                        continue
+                    if separate:
+                        lines = (binomial(m, line_m) * binomial(picks - m, main_count - line_m)
+                                 * binomial(j, line_j) * binomial(supp_picks - j, per_line_supp - line_j))
+                    else:
+                        lines = (binomial(m, line_m) * binomial(j, line_j)
+                                 * binomial(picks - m - j, main_count - line_m - line_j))
+                    wins[division] += lines
+            for division in range(1, divisions + 1):
+                if wins[division]:
+                    self.chance[division - 1] += probability
+                    self.expected_wins[division - 1] += probability * wins[division]
+            if any(wins):
+                self.win_chance += probability
+
+    @classmethod
+    def for_entry(cls, game, picks=None, supp_picks=None):
+        """The odds of an entry type, worked out once per game, picks and supp picks."""
+        key = (game["name"], picks, supp_picks)
+        odds = _odds.get(key)
+        if odds is None:
+            odds = _odds[key] = cls(game, picks, supp_picks)
+        return odds
+
+    def expected_value(self, amounts):
+        """Prize money an entry wins on average, given the amount paid per winning line in each division."""
+        return sum(float(wins) * amount for wins, amount in zip(self.expected_wins, amounts))
+
+
+def one_in(chance):
+    """A chance as 'one in N' (None for impossible)."""
+    return float(1 / chance) if chance else None
+
+
+def odds_report(game, picks=None, supp_picks=None, amounts=None):
+    """
+    Odds of every division for an entry in a game, for printing or JSON.
+
+    - amounts: Optional amount paid per winning line in each division (e.g.
+      mean dividends from prizes.dividend_distribution) for the expected
+      prize money per entry.
+    Returns {"game", "picks", "supp_picks", "lines", "win_one_in",
+    "divisions": [{"division", "outcomes", "probability", "one_in",
+    "expected_wins"}], "expected_value"}.
+    """
+    odds = DivisionOdds.for_entry(game, picks, supp_picks)
+    report = {"game": game["name"], "picks": odds.picks, "supp_picks": odds.supp_picks, "lines": odds.lines,
+              "win_one_in": one_in(odds.win_chance), "divisions": [
+                  {"division": division, "outcomes": [list(outcome) for outcome in outcomes],
+                   "probability": float(chance), "one_in": one_in(chance), "expected_wins": float(wins)}
+                  for division, (outcomes, chance, wins)
+                  in enumerate(zip(game["divisions"], odds.chance, odds.expected_wins), start=1)]}
+    report["expected_value"] = odds.expected_value(amounts) if amounts is not None else None
+    return report
@@ -0,0 +1,255 @@
+import array
+import math
+import os
+import struct
+
+from backtesting import STRATEGIES, run_backtest
+from draw_store import cache_file
+from ingest import iter_game_draws
+
+# Prize division analytics over the dividend columns of the results CSVs.
+#
+# The division winners, WA winners, prize pool and amount of every draw are
+# loaded into typed arrays laid out draw-major: entry draw * divisions + d is
+# division d + 1 of that draw. A division's history is then a strided slice
+# (amount[d::divisions]) that the statistics run over without building a
+# dict or tuple per row. Draws are kept oldest first, in the same order (and
+# with the same draws) as backtesting.load_draw_rows, so the amounts can be
+# handed straight to a backtest to price the lines it generates.
+#
+# The arrays are cached in CACHE_DIR (see draw_store) as a header followed by
+# the raw columns, and reused while the CSV's mtime and size are unchanged.
+
+MISSING = -1  # Winners / WA winners the CSV leaves empty; prize pools and amounts are NaN
+
+PRIZE_MAGIC = b"LOTTODIV"
+PRIZE_VERSION = 1
+# magic, version, divisions, num_draws, csv mtime_ns, csv size
+PRIZE_HEADER_FORMAT = "<8sHHIqq"
+PRIZE_HEADER_SIZE = struct.calcsize(PRIZE_HEADER_FORMAT)
+_COLUMNS = (("draw_number", "I"), ("draw_year", "H"), ("winners", "q"),
+            ("wa_winners", "q"), ("prize_pool", "d"), ("amount", "d"))
+
+
+class PrizeHistory:
+    """
+    Division results of a game's draw history, oldest draw first.
+
+    - draw_number: uint32 array, one entry per draw.
+    - draw_year: uint16 array (0 if the date is unknown).
+    - divisions: Number of prize divisions in the CSV.
+    - winners, wa_winners: int64 arrays, 'divisions' entries per draw (MISSING where empty).
+    - prize_pool, amount: float64 arrays, 'divisions' entries per draw (NaN where empty).
+    """
+
+    def __init__(self, divisions, draw_number, draw_year, winners, wa_winners, prize_pool, amount):
+        self.divisions = divisions
+        self.draw_number = draw_number
+        self.draw_year = draw_year
+        self.winners = winners
+        self.wa_winners = wa_winners
+        self.prize_pool = prize_pool
+        self.amount = amount
+
+    def __len__(self):
+        return len(self.draw_number)
+
+    def column(self, name, division):
+        """One field of one division (1-based) for every draw, e.g. column("amount", 1)."""
+        return getattr(self, name)[division - 1::self.divisions]
+
+    def payouts(self):
+        """Per draw, the amount paid per winning entry in each division (0 where unknown)."""
+        amounts = [0.0 if math.isnan(a) else a for a in self.amount]
+        d = self.divisions
+        return [amounts[i:i + d] for i in range(0, len(amounts), d)]
+
+
+def parse_prize_history(game):
+    """Parse a game's division results from its CSV (draws in the game's current format only)."""
+    draws = list(iter_game_draws(game["file"], game["main_count"], game["supp_count"]))
+    divisions = max((len(draw.divisions) for draw in draws), default=0)
+    draw_number = array.array("I")
+    draw_year = array.array("H")
+    winners = array.array("q")
+    wa_winners = array.array("q")
+    prize_pool = array.array("d")
+    amount = array.array("d")
+
+    nan = math.nan
+    for draw in reversed(draws):
+        draw_number.append(draw.draw_number)
+        draw_year.append(draw.draw_date.year if draw.draw_date else 0)
+        results = draw.divisions + ((None, None, None, None),) * (divisions - len(draw.divisions))
+        for won, wa_won, pool, paid in results:
+            winners.append(MISSING if won is None else won)
+            wa_winners.append(MISSING if wa_won is None else wa_won)
+            prize_pool.append(nan if pool is None else pool)
+            amount.append(nan if paid is None else paid)
+    return PrizeHistory(divisions, draw_number, draw_year, winners, wa_winners, prize_pool, amount)
+
+
+def _prize_cache_path(game):
+    return cache_file(game["file"], f"{game['main_count']}x{game['supp_count']}.prizes.bin")
+
+
+def _read_prize_cache(path, stat):
+    try:
+        with open(path, 'rb') as f:
+            raw = f.read()
+    except OSError:
+        return None
+    if len(raw) < PRIZE_HEADER_SIZE:
+        return None
+    magic, version, divisions, num_draws, mtime_ns, size = struct.unpack_from(PRIZE_HEADER_FORMAT, raw)
+    if (magic, version, mtime_ns, size) != (PRIZE_MAGIC, PRIZE_VERSION, stat.st_mtime_ns, stat.st_size):
+        return None
+
+    columns = []
+    offset = PRIZE_HEADER_SIZE
+    for name, fmt in _COLUMNS:
+        column = array.array(fmt)
+        nbytes = column.itemsize * num_draws * (divisions if name not in ("draw_number", "draw_year") else 1)
+        column.frombytes(raw[offset:offset + nbytes])
+        offset += nbytes
+        columns.append(column)
+    if offset != len(raw):
+        return None
+    return PrizeHistory(divisions, *columns)
+
+
+def _write_prize_cache(path, history, stat):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(struct.pack(PRIZE_HEADER_FORMAT, PRIZE_MAGIC, PRIZE_VERSION, history.divisions,
+                            len(history), stat.st_mtime_ns, stat.st_size))
+        for name, _ in _COLUMNS:
+            getattr(history, name).tofile(f)
+    os.replace(tmp_path, path)
+
+
+def load_prize_history(game):
+    """Load a game's division results, going through the cache."""
+    stat = os.stat(game["file"])
+    path = _prize_cache_path(game)
+    history = _read_prize_cache(path, stat)
+    if history is None:
+        history = parse_prize_history(game)
+        try:
+            _write_prize_cache(path, history, stat)
+        except OSError as e:
+            print(f"Could not write prize cache {path}: {e}")
+    return history
+
+
+def _quantile(ordered, q):
+    # Linear interpolation between closest ranks, like statistics.quantiles(method="inclusive")
+    pos = (len(ordered) - 1) * q
+    low = math.floor(pos)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (pos - low)
+
+
+def dividend_distribution(history):
+    """
+    Per division, the spread of the amount paid per winning entry over the
+    draws where the division was won.
+
+    Returns a list (division 1 first) of dicts with "division", "draws" (won
+    in), "mean_winners", "min", "p10", "median", "mean", "p90" and "max";
+    the amount statistics are None for a division that was never won.
+    """
+    stats = []
+    for division in range(1, history.divisions + 1):
+        won = [(w, a) for w, a in zip(history.column("winners", division), history.column("amount", division))
+               if w > 0 and not math.isnan(a)]
+        amounts = sorted(a for _, a in won)
+        entry = {"division": division, "draws": len(amounts),
+                 "mean_winners": sum(w for w, _ in won) / len(won) if won else 0.0}
+        if amounts:
+            entry.update(min=amounts[0], p10=_quantile(amounts, 0.1), median=_quantile(amounts, 0.5),
+                         mean=math.fsum(amounts) / len(amounts), p90=_quantile(amounts, 0.9),
+                         max=amounts[-1])
+        else:
+            entry.update(dict.fromkeys(("min", "p10", "median", "mean", "p90", "max")))
+        stats.append(entry)
+    return stats
+
+
+def jackpot_rollovers(history):
+    """
+    Division 1 jackpot trend: a draw where nobody wins division 1 rolls the jackpot over.
+
+    Returns a dict with "draws" (with a known division 1 result), "jackpots"
+    (draws won), "rollover_rate", "longest_run" and "mean_run" (consecutive
+    rollovers between jackpots), "current_run" (rollovers since the last
+    jackpot) and "years": {year: {"draws", "jackpots", "mean_pool"}}.
+    """
+    if not history.divisions:
+        return {"draws": 0, "jackpots": 0, "rollover_rate": None, "longest_run": 0,
+                "mean_run": None, "current_run": 0, "years": {}}
+    winners = history.column("winners", 1)
+    pools = history.column("prize_pool", 1)
+
+    runs = []
+    run = 0
+    years = {}
+    draws = jackpots = 0
+    for year, won, pool in zip(history.draw_year, winners, pools):
+        if won == MISSING:
+            continue
+        draws += 1
+        by_year = years.setdefault(year, [0, 0, 0.0, 0])
+        by_year[0] += 1
+        if not math.isnan(pool):
+            by_year[2] += pool
+            by_year[3] += 1
+        if won > 0:
+            jackpots += 1
+            by_year[1] += 1
+            runs.append(run)
+            run = 0
+        else:
+            run += 1
+
+    return {
+        "draws": draws,
+        "jackpots": jackpots,
+        "rollover_rate": (draws - jackpots) / draws if draws else None,
+        "longest_run": max([run, *runs]),
+        "mean_run": sum(runs) / len(runs) if runs else None,
+        "current_run": run,
+        "years": {year: {"draws": n, "jackpots": won, "mean_pool": pool_sum / pooled if pooled else None}
+                  for year, (n, won, pool_sum, pooled) in sorted(years.items()) if year},
+    }
+
+
+def strategy_expected_values(game, history=None, strategies=STRATEGIES, seeds=10, test_draws=100,
+                             lines_per_draw=5, workers=None, base_seed=None):
+    """
+    Average prize money won per line by each generation strategy, walking
+    forward over the most recent 'test_draws' draws and paying each line the
+    dividend its division actually paid in that draw.
+
+    Returns {strategy: {"runs", "draws", "lines", "winnings", "ev_per_line"}}.
+    """
+    if history is None:
+        history = load_prize_history(game)
+    results = run_backtest(game, strategies, seeds, test_draws, lines_per_draw, workers, base_seed,
+                           payouts=history.payouts())
+    return {strategy: {"runs": result["runs"], "draws": result["draws"], "lines": result["lines"],
+                       "winnings": result["winnings"],
+                       "ev_per_line": result["winnings"] / result["lines"] if result["lines"] else None}
+            for strategy, result in results.items()}
+
+
+def prize_report(game, expected_values=True, **backtest_options):
+    """Dividend distribution, jackpot rollovers and (optionally) strategy expected values for a game."""
+    history = load_prize_history(game)
+    report = {"game": game["name"], "draws": len(history),
+              "dividends": dividend_distribution(history),
+              "jackpots": jackpot_rollovers(history)}
+    if expected_values:
+        report["expected_values"] = strategy_expected_values(game, history, **backtest_options)
+    return report
@@ -0,0 +1,385 @@
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import combinations
+
+from draw_store import load_columns
+from frequency import DrawIncidence
+
+# Randomness tests over a game's main number history.
+#
+# Every test works on the per-ball draw bitsets of frequency.DrawIncidence
+# (bit i set when the ball came up in draw i, most recent draw first):
+#
+# - uniformity: chi-square of how often each ball was drawn against the
+#   expected draws * per_draw / balls.
+# - runs: Wald-Wolfowitz runs test on each ball's hit/miss sequence; a run
+#   boundary is a set bit of mask ^ (mask >> 1), so runs are one popcount.
+#   The balls' z-scores are combined into one chi-square-like statistic, but
+#   every draw hits exactly per_draw balls, so they aren't independent and
+#   its p-value comes from the same random histories as the pair test's.
+# - gaps: chi-square of the gaps between a ball's appearances against the
+#   geometric distribution they follow if draws are independent.
+# - pairs: chi-square of every pair's co-occurrence count against the
+#   hypergeometric expectation draws * k(k-1) / (n(n-1)). Pair counts are
+#   not independent of each other, so besides the asymptotic p-value a
+#   bootstrap p-value is worked out from histories of uniformly random draws.
+# - serial: numbers repeated from one draw to the next, with a permutation
+#   p-value from shuffling the order of the draws.
+#
+# The resamples are split into chunks and spread over a process pool.
+#
+# Games have changed barrel size over time (Oz Lotto went from 45 to 47
+# balls). A ball that never appears in the older part of the history, when
+# chance would have had it turn up many times over, marks such a change, and
+# the tests then only use the draws since then (see format_draws).
+
+SIGNIFICANCE = 0.05
+RESAMPLE_CHUNK = 100
+
+_state = None  # {game file: (balls, per_draw, draws, draw masks)} in pool workers
+
+
+# Distributions
+
+def _gamma_series(a, x):
+    # Regularized lower incomplete gamma P(a, x) by its series (x < a + 1)
+    term = total = 1 / a
+    n = a
+    while abs(term) > abs(total) * 1e-15:
+        n += 1
+        term *= x / n
+        total += term
+    return total * math.exp(-x + a * math.log(x) - math.lgamma(a))
+
+
+def _gamma_continued_fraction(a, x):
+    # Regularized upper incomplete gamma Q(a, x) by Lentz's continued fraction (x >= a + 1)
+    tiny = 1e-300
+    b = x + 1 - a
+    c = 1 / tiny
+    d = 1 / b
+    h = d
+    for i in range(1, 1000):
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d = tiny if abs(d) < tiny else d
+        c = b + an / c
+        c = tiny if abs(c) < tiny else c
+        d = 1 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1) < 1e-15:
+            break
+    return math.exp(-x + a * math.log(x) - math.lgamma(a)) * h
+
+
+def chi_square_p(statistic, df):
+    """P(X >= statistic) for X chi-square distributed with 'df' degrees of freedom."""
+    if df <= 0:
+        return 1.0
+    a, x = df / 2, statistic / 2
+    if x <= 0:
+        return 1.0
+    if x < a + 1:
+        return max(0.0, 1 - _gamma_series(a, x))
+    return _gamma_continued_fraction(a, x)
+
+
+def normal_p(z):
+    """Two-sided p-value of a standard normal z-score."""
+    return math.erfc(abs(z) / math.sqrt(2))
+
+
+def _chi_square(observed, expected):
+    return sum((o - e) ** 2 / e for o, e in zip(observed, expected) if e > 0)
+
+
+# History
+
+def format_draws(incidence, balls, per_draw):
+    """
+    How many of the most recent draws were made with the full barrel of 'balls'.
+
+    A ball first seen m draws back, when it would have been missed for
+    20 * balls / per_draw draws only with probability around e^-20, means
+    the barrel was smaller before then.
+    """
+    newest_first_seen = min(((incidence.masks.get(ball, 0).bit_length()) for ball in range(1, balls + 1)),
+                            default=0)
+    if incidence.num_draws - newest_first_seen > 20 * balls / per_draw:
+        return newest_first_seen
+    return incidence.num_draws
+
+
+def load_history(game):
+    """
+    (balls, per_draw, draws, per-draw main number masks oldest first) for a
+    game, limited to the draws made with its current barrel.
+    """
+    columns = load_columns(game["file"], game["main_count"], game["supp_count"])
+    per_draw = game["main_count"]
+    balls = game["main_balls"]
+    incidence = DrawIncidence(columns.flat_main(), per_draw)
+    draws = format_draws(incidence, balls, per_draw)
+    draw_masks = []
+    for i in range(draws - 1, -1, -1):
+        mask = 0
+        for n in columns.main_row(i):
+            mask |= 1 << n
+        draw_masks.append(mask)
+    return balls, per_draw, draws, draw_masks
+
+
+def _ball_masks(draw_masks, balls):
+    # Per-ball bitsets (bit i = draw i of draw_masks) from per-draw masks
+    masks = [0] * (balls + 1)
+    for i, draw in enumerate(draw_masks):
+        bit = 1 << i
+        while draw:
+            low = draw & -draw
+            masks[low.bit_length() - 1] |= bit
+            draw ^= low
+    return masks
+
+
+# Tests
+
+def uniformity_test(ball_masks, balls, per_draw, draws):
+    counts = [ball_masks[ball].bit_count() for ball in range(1, balls + 1)]
+    expected = draws * per_draw / balls
+    statistic = _chi_square(counts, [expected] * balls)
+    deviation = sorted(range(1, balls + 1), key=lambda ball: -abs(counts[ball - 1] - expected))
+    return {"test": "uniformity", "statistic": statistic, "df": balls - 1,
+            "p_value": chi_square_p(statistic, balls - 1),
+            "most_deviant": [(ball, counts[ball - 1], round(expected, 1)) for ball in deviation[:3]]}
+
+
+def _runs_z_scores(ball_masks, balls, draws):
+    # Runs test z-score of every ball that was both drawn and missed
+    inner = (1 << (draws - 1)) - 1 if draws > 1 else 0
+    z_scores = {}
+    for ball in range(1, balls + 1):
+        mask = ball_masks[ball]
+        hits = mask.bit_count()
+        misses = draws - hits
+        if not hits or not misses:
+            continue
+        runs = ((mask ^ (mask >> 1)) & inner).bit_count() + 1
+        expected = 2 * hits * misses / draws + 1
+        variance = 2 * hits * misses * (2 * hits * misses - draws) / (draws * draws * (draws - 1))
+        if variance > 0:
+            z_scores[ball] = (runs - expected) / math.sqrt(variance)
+    return z_scores
+
+
+def runs_statistic(ball_masks, balls, draws):
+    """Sum of the squared runs test z-scores of the balls."""
+    return sum(z * z for z in _runs_z_scores(ball_masks, balls, draws).values())
+
+
+def runs_test(ball_masks, balls, draws):
+    # "p_value" is the chi-square approximation until randomness_reports
+    # replaces it with a resampled one (see the note at the top)
+    z_scores = _runs_z_scores(ball_masks, balls, draws)
+    statistic = sum(z * z for z in z_scores.values())
+    flagged = sorted(ball for ball, z in z_scores.items() if normal_p(z) < SIGNIFICANCE)
+    approximate = chi_square_p(statistic, len(z_scores))
+    return {"test": "runs", "statistic": statistic, "df": len(z_scores),
+            "p_value": approximate, "approximate_p_value": approximate, "resamples": 0,
+            "flagged": flagged, "expected_flagged": round(len(z_scores) * SIGNIFICANCE, 1)}
+
+
+def gap_test(ball_masks, balls, per_draw):
+    p = per_draw / balls
+    gaps = {}
+    for ball in range(1, balls + 1):
+        mask = ball_masks[ball]
+        previous = None
+        while mask:
+            low = mask & -mask
+            position = low.bit_length() - 1
+            if previous is not None:
+                gap = position - previous
+                gaps[gap] = gaps.get(gap, 0) + 1
+            previous = position
+            mask ^= low
+    total = sum(gaps.values())
+    if not total:
+        return {"test": "gaps", "statistic": 0.0, "df": 0, "p_value": 1.0, "bins": 0}
+
+    # Bins 1, 2, ... while they expect at least 5 gaps; the last bin takes the tail
+    observed, expected = [], []
+    gap = 1
+    tail = 1.0
+    while True:
+        probability = (1 - p) ** (gap - 1) * p
+        if total * (tail - probability) < 5:
+            break
+        observed.append(gaps.pop(gap, 0))
+        expected.append(total * probability)
+        tail -= probability
+        gap += 1
+    observed.append(sum(gaps.values()))
+    expected.append(total * tail)
+    statistic = _chi_square(observed, expected)
+    df = len(observed) - 1
+    return {"test": "gaps", "statistic": statistic, "df": df, "p_value": chi_square_p(statistic, df),
+            "bins": len(observed)}
+
+
+def pair_statistic(ball_masks, balls, per_draw, draws):
+    expected = draws * per_draw * (per_draw - 1) / (balls * (balls - 1))
+    if not expected:
+        return 0.0
+    masks = ball_masks[1:balls + 1]
+    return sum(((a & b).bit_count() - expected) ** 2 for a, b in combinations(masks, 2)) / expected
+
+
+def serial_statistic(draw_masks):
+    """Numbers repeated from each draw in the next one, summed over the history."""
+    return sum((a & b).bit_count() for a, b in zip(draw_masks, draw_masks[1:]))
+
+
+# Resampling
+
+@lru_cache(maxsize=None)
+def _subset_masks(balls, size):
+    return [sum(1 << ball for ball in subset) for subset in combinations(range(1, balls + 1), size)]
+
+
+def _random_ball_masks(rng, balls, per_draw, draws):
+    # Per-ball bitsets of a history of uniformly random draws. A draw is the
+    # union of a random half-size subset and a random disjoint other half (each
+    # draw arises from the same number of such pairs, so draws are uniform);
+    # the draws are written out as rows of '0'/'1' and each ball's column is
+    # read back as one binary int.
+    first = _subset_masks(balls, per_draw // 2)
+    second = _subset_masks(balls, per_draw - per_draw // 2)
+    n_first, n_second = len(first), len(second)
+    rand = rng.random
+    width = balls + 1
+    row_format = f"0{width}b"
+    rows = []
+    for _ in range(draws):
+        while True:
+            a = first[int(rand() * n_first)]
+            b = second[int(rand() * n_second)]
+            if not a & b:
+                break
+        rows.append(format(a | b, row_format))
+    text = "".join(reversed(rows))  # Draw 0 ends up least significant
+    return [int(text[width - 1 - ball::width], 2) if draws else 0 for ball in range(width)]
+
+
+def _simulate_histories(balls, per_draw, draws, count, seed):
+    # (pair statistic, runs statistic) of 'count' histories of uniformly random draws
+    rng = random.Random(seed)
+    statistics = []
+    for _ in range(count):
+        ball_masks = _random_ball_masks(rng, balls, per_draw, draws)
+        statistics.append((pair_statistic(ball_masks, balls, per_draw, draws),
+                           runs_statistic(ball_masks, balls, draws)))
+    return statistics
+
+
+def _permute_serial(draw_masks, count, seed):
+    # Serial statistics of 'count' shuffles of the draw order
+    rng = random.Random(seed)
+    shuffled = list(draw_masks)
+    statistics = []
+    for _ in range(count):
+        rng.shuffle(shuffled)
+        statistics.append(serial_statistic(shuffled))
+    return statistics
+
+
+def _init_worker(state):
+    global _state
+    _state = state
+
+
+def _run_task(task):
+    key, test, count, seed = task
+    balls, per_draw, draws, draw_masks = _state[key]
+    if test == "histories":
+        return _simulate_histories(balls, per_draw, draws, count, seed)
+    return _permute_serial(draw_masks, count, seed)
+
+
+def _resample(state, tasks, workers):
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers == 1 or len(tasks) <= 1:
+        _init_worker(state)
+        return list(map(_run_task, tasks))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(state,)) as pool:
+        return list(pool.map(_run_task, tasks))
+
+
+def _empirical_p(observed, simulated, two_sided=False):
+    # (1 + resamples at least as extreme) / (1 + resamples)
+    if two_sided:
+        centre = sum(simulated) / len(simulated)
+        extreme = sum(1 for s in simulated if abs(s - centre) >= abs(observed - centre))
+    else:
+        extreme = sum(1 for s in simulated if s >= observed)
+    return (1 + extreme) / (1 + len(simulated))
+
+
+def randomness_reports(games, resamples=1000, workers=None, seed=None):
+    """
+    Run the test battery for each game (a list of games table entries).
+
+    - resamples: Bootstrap histories for the pair and runs tests and
+      draw-order shuffles for the serial test (0 skips the resampled
+      p-values; the runs test then keeps its approximate one).
+    - workers: Processes for the resampling (default: one per core); 1 runs in this process.
+    - seed: Makes the resampled p-values reproducible.
+
+    Returns a list with, per game, {"game", "draws", "balls", "tests": [...]}
+    where each test is a dict with at least "test", "statistic" and "p_value".
+    """
+    state = {}
+    reports = []
+    for game in games:
+        balls, per_draw, draws, draw_masks = load_history(game)
+        state[game["file"]] = (balls, per_draw, draws, draw_masks)
+        ball_masks = _ball_masks(draw_masks, balls)
+        pairs = pair_statistic(ball_masks, balls, per_draw, draws)
+        pair_df = balls * (balls - 1) // 2 - 1
+        serial = serial_statistic(draw_masks)
+        reports.append({"game": game["name"], "draws": draws, "balls": balls, "tests": [
+            uniformity_test(ball_masks, balls, per_draw, draws),
+            runs_test(ball_masks, balls, draws),
+            gap_test(ball_masks, balls, per_draw),
+            {"test": "pairs", "statistic": pairs, "df": pair_df, "p_value": chi_square_p(pairs, pair_df)},
+            {"test": "serial", "statistic": serial,
+             "expected": (draws - 1) * per_draw * per_draw / balls},
+        ]})
+
+    rng = random.Random(seed)
+    tasks = []
+    for game in games:
+        for test in ("histories", "serial"):
+            for start in range(0, resamples, RESAMPLE_CHUNK):
+                tasks.append((game["file"], test, min(RESAMPLE_CHUNK, resamples - start), rng.getrandbits(64)))
+    simulated = {}
+    for (key, test, _, _), statistics in zip(tasks, _resample(state, tasks, workers) if tasks else []):
+        simulated.setdefault((key, test), []).extend(statistics)
+
+    for game, report in zip(games, reports):
+        runs, pairs, serial = report["tests"][1], report["tests"][3], report["tests"][4]
+        histories = simulated.get((game["file"], "histories"))
+        serial_sims = simulated.get((game["file"], "serial"))
+        pairs["resampled_p_value"] = None
+        if histories:
+            pairs["resampled_p_value"] = _empirical_p(pairs["statistic"], [p for p, _ in histories])
+            runs["p_value"] = _empirical_p(runs["statistic"], [r for _, r in histories])
+            runs["resamples"] = len(histories)
+        serial["p_value"] = _empirical_p(serial["statistic"], serial_sims, two_sided=True) if serial_sims else None
+        pairs["resamples"] = serial["resamples"] = len(histories or [])
+    return reports
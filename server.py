@@ -0,0 +1,390 @@
+import asyncio
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+import lotto
+from checker import (check_lines_against_history, match_summary, numbers_mask, validate_line,
+                     validate_winning_numbers)
+from cooccurrence import CooccurrenceIndex
+
+# Local HTTP/JSON service over the lotto functions.
+#
+# Every game's frequency report and co-occurrence index are built once at
+# startup and kept in memory, so frequency, pair and small generation or
+# check requests are answered on the event loop from those. Reports that
+# take real work the first time they're asked for (recency weighted
+# frequencies, windowed pairs or triples, odds) are built on one builder
+# thread and kept, up to MAX_CACHED of them. Work that grows with the
+# request (more than INLINE_LINES lines to generate or check, coverage,
+# pair-weighted or unique generation, or a check against the whole draw
+# history) is handed to a process pool, so one big batch doesn't hold up
+# everyone else; a request whose job runs past JOB_SECONDS gets a 504
+# instead of waiting on. A watcher polls the CSVs and
+# rebuilds a game's indexes, on the builder thread, when its file changes.
+#
+# Endpoints (game is a menu number or CSV name, e.g. "1" or "saturday-lotto"):
+#   GET  /health
+#   GET  /games
+#   GET  /frequency?game=..[&window=N][&half_life=H][&since=D][&until=D]
+#   GET  /pairs?game=..[&top=K][&window=N][&with=n][&triples=1]
+#   GET  /odds?game=..[&picks=N][&supp_picks=N]
+#   POST /generate  {"game", "lines", "seed", "deterministic", "cover", "top",
+#                    "unique", "pairs", "uniform", "half_life", "window", "since", "until"}
+#   POST /check     {"game", "lines": [{"main": [..], "supp": [..]}, ..],
+#                    "main": [..], "supp": [..]} or {"game", "lines", "history": true}
+# Errors come back as {"error": message} with a 4xx status.
+
+INLINE_LINES = 10_000
+MAX_LINES = 1_000_000
+MAX_BODY = 64 << 20
+POLL_SECONDS = 2.0
+JOB_SECONDS = 60.0  # Longest a request waits on a pool job
+MAX_CACHED = 4096  # Reports built for requests that are kept; beyond this the oldest is dropped
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _generate(game, lines, options, report):
+    # Runs in the pool for big batches; 'report' comes from the server's hot copy
+    if options.get("uniform"):
+        return lotto.uniform_game_lines(game, lines, options.get("seed"))
+    return lotto.generate_game_lines(game, lines, bool(options.get("deterministic")), options.get("seed"),
+                                     report, coverage=options.get("cover"), top=options.get("top"),
+                                     unique=bool(options.get("unique")), pairs=bool(options.get("pairs")))
+
+
+def _check(game, line_masks, winning_main, winning_supp):
+    return lotto.summary_rows(match_summary(game, line_masks, winning_main, winning_supp))
+
+
+def _check_history(game, line_masks):
+    per_line, overall, num_draws = check_lines_against_history(game, line_masks, workers=1)
+    return {"draws": num_draws, "summary": lotto.summary_rows(overall),
+            "per_line": [lotto.summary_rows(histogram) for histogram in per_line]}
+
+
+def _int_option(value, name, minimum=None):
+    if value is None or value == "":
+        return None
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise HttpError(400, f"'{name}' must be an integer.")
+    if minimum is not None and number < minimum:
+        raise HttpError(400, f"'{name}' must be at least {minimum}.")
+    return number
+
+
+def _date_option(value, name):
+    if value is None or value == "":
+        return None
+    day = lotto.parse_date_arg(str(value))
+    if day is None:
+        raise HttpError(400, f"'{name}' must be a date (dd/mm/yyyy or yyyy-mm-dd).")
+    return day
+
+
+class ResultsServer:
+    """
+    asyncio HTTP server answering from in-memory indexes of every game.
+
+    - games: The games table (default lotto.GAMES).
+    - workers: Processes for batch work (default: one per core).
+    - poll: Seconds between checks of the CSVs for changes.
+    """
+
+    def __init__(self, games=None, workers=None, poll=POLL_SECONDS):
+        self.games = games or lotto.GAMES
+        self.poll = poll
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+        # One thread, so index rebuilds and report builds never run over each other
+        self.builder = ThreadPoolExecutor(max_workers=1)
+        self.reports = {}  # game file -> frequency report
+        self.stamps = {}   # game file -> (mtime_ns, size) the indexes were built from
+        self.cache = {}    # (game file, kind, options) -> report built on the builder thread
+
+    # Indexes
+
+    def _stamp(self, game):
+        try:
+            stat = os.stat(game["file"])
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def load(self, game):
+        """(Re)build a game's in-memory indexes from its CSV."""
+        stamp = self._stamp(game)
+        lotto.clear_session_cache(game)
+        report = lotto.frequency_report(game)
+        if report["main"]:
+            # Builds the all-draws pair matrix now rather than on the first query
+            CooccurrenceIndex.for_game(game).pair_matrix()
+        self.reports[game["file"]] = report
+        self.stamps[game["file"]] = stamp
+
+    def load_all(self):
+        for game in self.games.values():
+            self.load(game)
+
+    async def watch(self):
+        """
+        Rebuild the indexes of every game whose CSV has changed, every 'poll' seconds.
+        A rebuild that fails (e.g. on a half-written CSV) is reported and tried again next time.
+        """
+        loop = asyncio.get_running_loop()
+        failed = {}  # game file -> stamp of the CSV that last failed to load, so it's reported once
+        while True:
+            await asyncio.sleep(self.poll)
+            for game in self.games.values():
+                stamp = self._stamp(game)
+                if stamp == self.stamps.get(game["file"]):
+                    continue
+                try:
+                    await loop.run_in_executor(self.builder, self.load, game)
+                except Exception as e:
+                    if failed.get(game["file"]) != stamp:
+                        print(f"Could not reload {game['file']}: {type(e).__name__}: {e}", flush=True)
+                        failed[game["file"]] = stamp
+                    continue
+                failed.pop(game["file"], None)
+                for key in [key for key in self.cache if key[0] == game["file"]]:
+                    del self.cache[key]
+
+    # Requests
+
+    def _game(self, value):
+        game = lotto.find_game(str(value)) if value is not None else None
+        if game is None:
+            raise HttpError(400, f"Unknown game '{value}'.")
+        if not self.reports.get(game["file"], {}).get("main"):
+            raise HttpError(503, f"No draws loaded for {game['name']}.")
+        return game
+
+    async def _cached(self, game, key, func, *args):
+        # A report kept from an earlier request, or built on the builder thread
+        # so the event loop keeps serving; ValueError becomes a 400
+        key = (game["file"],) + key
+        report = self.cache.get(key)
+        if report is None:
+            try:
+                report = await asyncio.get_running_loop().run_in_executor(self.builder, func, *args)
+            except ValueError as e:
+                raise HttpError(400, str(e))
+            if len(self.cache) >= MAX_CACHED:
+                del self.cache[next(iter(self.cache))]
+            self.cache[key] = report
+        return report
+
+    async def _report(self, game, options, counts=False):
+        # The hot all-time report, or a recency weighted one (see weighting.RunningWeights).
+        # With 'counts', a plain window gives draw counts like `lotto.py frequency --window`
+        half_life = options.get("half_life")
+        window = _int_option(options.get("window"), "window", 1)
+        since = _date_option(options.get("since"), "since")
+        until = _date_option(options.get("until"), "until")
+        if half_life in (None, "") and window is None and since is None and until is None:
+            return self.reports[game["file"]]
+        if counts and half_life in (None, "") and since is None and until is None:
+            return await self._cached(game, ("counts", window), lotto.frequency_report, game, window)
+        try:
+            half_life = float(half_life) if half_life not in (None, "") else None
+        except (TypeError, ValueError):
+            raise HttpError(400, "'half_life' must be a number.")
+        report = await self._cached(game, ("frequency", half_life, window, since, until),
+                                    lotto.weighted_frequency_report, game, half_life, window, since, until)
+        if not report["draws"]:
+            raise HttpError(400, "No draws to weight numbers by (check the date range).")
+        return report
+
+    def _line_masks(self, game, lines):
+        if not isinstance(lines, list) or not lines:
+            raise HttpError(400, "'lines' must be a non-empty list of lines.")
+        if len(lines) > MAX_LINES:
+            raise HttpError(413, f"At most {MAX_LINES} lines per request.")
+        masks = []
+        for i, line in enumerate(lines, start=1):
+            main, supp = (line.get("main"), line.get("supp", [])) if isinstance(line, dict) else (line, [])
+            if not game["user_supp_count"]:
+                supp = []  # Players don't pick them (they may still come from /generate)
+            if not isinstance(main, list) or not isinstance(supp, list):
+                raise HttpError(400, f"Line {i}: 'main' and 'supp' must be lists of numbers.")
+            try:
+                validate_line(game, main, supp)
+            except ValueError as e:
+                raise HttpError(400, f"Line {i}: {e}")
+            masks.append((numbers_mask(main), numbers_mask(supp)))
+        return masks
+
+    def _winning_numbers(self, game, options):
+        main, supp = options.get("main"), options.get("supp", [])
+        if not isinstance(main, list) or not isinstance(supp, list):
+            raise HttpError(400, "'main' and 'supp' must be lists of the winning numbers.")
+        try:
+            validate_winning_numbers(game, main, supp)
+        except ValueError as e:
+            raise HttpError(400, str(e))
+        return main, supp
+
+    async def _run(self, inline, func, *args):
+        # Small jobs run right here; batches go to the process pool, where a
+        # job that outlasts JOB_SECONDS still finishes but the request gets a 504
+        if inline:
+            return func(*args)
+        job = asyncio.get_running_loop().run_in_executor(self.pool, func, *args)
+        try:
+            return await asyncio.wait_for(job, JOB_SECONDS)
+        except asyncio.TimeoutError:
+            raise HttpError(504, f"The request took longer than {JOB_SECONDS:g} seconds.")
+
+    async def dispatch(self, method, path, query, body):
+        if path == "/health":
+            return {"status": "ok", "games": {game["name"]: self.reports.get(game["file"], {}).get("draws", 0)
+                                              for game in self.games.values()}}
+        if path == "/games":
+            return [{"id": key, "name": game["name"], "file": game["file"],
+                     "draws": self.reports.get(game["file"], {}).get("draws", 0)}
+                    for key, game in self.games.items()]
+
+        if path == "/odds":
+            game = self._game(query.get("game"))
+            picks = _int_option(query.get("picks"), "picks")
+            supp_picks = _int_option(query.get("supp_picks"), "supp_picks")
+            return await self._cached(game, ("odds", picks, supp_picks), lotto.game_odds, game, picks, supp_picks)
+
+        if path in ("/frequency", "/pairs"):
+            if method != "GET":
+                raise HttpError(405, f"Use GET for {path}.")
+            game = self._game(query.get("game"))
+            if path == "/frequency":
+                return {"game": game["name"], **await self._report(game, query, counts=True)}
+            options = (_int_option(query.get("top"), "top", 1) or 10, _int_option(query.get("window"), "window", 1),
+                       _int_option(query.get("with"), "with"), query.get("triples", "") not in ("", "0", "false"))
+            report = await self._cached(game, ("pairs",) + options, lotto.cooccurrence_report, game, *options)
+            return {"game": game["name"], **report}
+
+        if path in ("/generate", "/check"):
+            if method != "POST":
+                raise HttpError(405, f"Use POST for {path}.")
+            try:
+                options = json.loads(body or b"{}")
+            except ValueError:
+                raise HttpError(400, "The request body must be JSON.")
+            if not isinstance(options, dict):
+                raise HttpError(400, "The request body must be a JSON object.")
+            game = self._game(options.get("game"))
+
+            if path == "/generate":
+                lines = _int_option(options.get("lines", 5), "lines", 1)
+                if lines > MAX_LINES:
+                    raise HttpError(413, f"At most {MAX_LINES} lines per request.")
+                for name in ("seed", "cover", "top"):
+                    options[name] = _int_option(options.get(name), name)
+                report = await self._report(game, options)
+                # Plain uniform, weighted or deterministic picks are quick; coverage,
+                # pair weighting and unique redraws can take a while at any size
+                quick = not (options["cover"] or options.get("pairs") or options.get("unique"))
+                try:
+                    generated = await self._run(quick and lines <= INLINE_LINES, _generate, game, lines,
+                                                options, report)
+                except ValueError as e:
+                    raise HttpError(400, str(e))
+                return {"game": game["name"], "lines": [{"main": m, "supp": s} for m, s in generated]}
+
+            line_masks = self._line_masks(game, options.get("lines"))
+            if options.get("history"):
+                result = await self._run(False, _check_history, game, line_masks)
+                return {"game": game["name"], "lines": len(line_masks), **result}
+            winning_main, winning_supp = self._winning_numbers(game, options)
+            summary = await self._run(len(line_masks) <= INLINE_LINES, _check, game, line_masks,
+                                      winning_main, winning_supp)
+            return {"game": game["name"], "lines": len(line_masks), "summary": summary}
+
+        raise HttpError(404, f"No such endpoint {path}.")
+
+    # HTTP
+
+    async def _read_request(self, reader):
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, target, version = line.decode("latin-1").split()
+        except ValueError:
+            raise HttpError(400, "Malformed request line.")
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = _int_option(headers.get("content-length", 0), "Content-Length", 0) or 0
+        if length > MAX_BODY:
+            raise HttpError(413, "Request body too large.")
+        body = await reader.readexactly(length) if length else b""
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection == "keep-alive" or (version == "HTTP/1.1" and connection != "close")
+        return method.upper(), target, body, keep_alive
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                keep_alive = False
+                try:
+                    request = await self._read_request(reader)
+                    if request is None:
+                        break
+                    method, target, body, keep_alive = request
+                    url = urlsplit(target)
+                    query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+                    status, payload = 200, await self.dispatch(method, url.path, query, body)
+                except HttpError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except Exception as e:
+                    status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+
+                data = json.dumps(payload).encode("utf-8")
+                head = (f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                        f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+                writer.write(head.encode("latin-1") + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8000):
+        """Load every game, then serve until cancelled."""
+        await asyncio.to_thread(self.load_all)
+        server = await asyncio.start_server(self.handle, host, port)
+        watcher = asyncio.create_task(self.watch())
+        addresses = ", ".join(f"{sock.getsockname()[0]}:{sock.getsockname()[1]}" for sock in server.sockets)
+        print(f"Serving lottery results on {addresses}", flush=True)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            watcher.cancel()
+            self.pool.shutdown(cancel_futures=True)
+            self.builder.shutdown(cancel_futures=True)
+
+
+def serve(host="127.0.0.1", port=8000, workers=None, poll=POLL_SECONDS):
+    """Run a ResultsServer until interrupted (Ctrl+C)."""
+    try:
+        asyncio.run(ResultsServer(workers=workers, poll=poll).serve(host, port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,149 @@
+import os
+from collections import deque
+
+from draw_store import load_columns
+
+# Recency-weighted number frequencies for line generation.
+#
+# All-time counts treat a draw from decades ago like last week's. A
+# RunningWeights instead weights each number by the draws it came up in
+# under one scheme, or a combination of them:
+#
+# - half_life: exponential decay; a draw counts half as much once
+#   'half_life' newer draws have been made.
+# - window: only the most recent 'window' draws count.
+# - since / until: only draws dated within the range count ("Draw date").
+#
+# The weights are running accumulators fed one draw at a time, oldest
+# first: a new draw scales the existing weights by the decay factor, adds
+# its numbers, and takes off the draw that just left the window, which is
+# O(balls). Accumulators are shared per game file and scheme; when the CSV
+# changes only the draws newer than the last one added are fed in.
+
+_accumulators = {}  # (csv path, main_count, supp_count, scheme) -> ((mtime_ns, size), RunningWeights)
+MAX_ACCUMULATORS = 256  # Beyond this the oldest scheme is dropped (the server takes schemes from requests)
+
+_FORGET = 1e-9  # Weights that decayed below this are dropped
+
+
+def date_number(value):
+    """A datetime.date as the yyyymmdd int draw_store keeps draw dates as (None stays None)."""
+    return None if value is None else value.year * 10000 + value.month * 100 + value.day
+
+
+class RunningWeights:
+    """
+    Main and supplementary number weights under a recency scheme.
+
+    - half_life: Draws after which a draw's weight has halved (None: no decay).
+    - window: Only count the most recent 'window' draws (None: all).
+    - since, until: Only count draws dated on or after / on or before these
+      datetime.dates (None: open ended). Draws without a date then don't count.
+    Use RunningWeights.for_game(game, ...) to share one accumulator per game and scheme.
+    """
+
+    def __init__(self, half_life=None, window=None, since=None, until=None):
+        if half_life is not None and half_life <= 0:
+            raise ValueError("The half-life must be a positive number of draws.")
+        if window is not None and window <= 0:
+            raise ValueError("The window must be at least one draw.")
+        if since is not None and until is not None and since > until:
+            raise ValueError("The date range ends before it starts.")
+        self.half_life = half_life
+        self.window = window
+        self.since = date_number(since)
+        self.until = date_number(until)
+        self.decay = 0.5 ** (1 / half_life) if half_life else 1.0
+        self.main = {}          # number -> weight
+        self.supp = {}
+        self.draws = 0          # Draws currently counted
+        self.supp_draws = 0
+        self.recent = deque()   # (main, supp) of the counted draws in the window, oldest first
+        self.last_draw = None   # Draw number of the newest draw fed in
+
+    @classmethod
+    def for_game(cls, game, half_life=None, window=None, since=None, until=None):
+        """The accumulator for a game and scheme, brought up to date with its CSV."""
+        stat = os.stat(game["file"])
+        key = (os.path.abspath(game["file"]), game["main_count"], game["supp_count"],
+               half_life, window, since, until)
+        cached = _accumulators.get(key)
+        if cached is not None and cached[0] == (stat.st_mtime_ns, stat.st_size):
+            return cached[1]
+        weights = cached[1] if cached is not None else cls(half_life, window, since, until)
+        columns = load_columns(game["file"], game["main_count"], game["supp_count"])
+        if not weights.add_new_draws(columns):
+            # The CSV doesn't continue the draws already added
+            weights = cls(half_life, window, since, until)
+            weights.add_new_draws(columns)
+        if cached is None and len(_accumulators) >= MAX_ACCUMULATORS:
+            del _accumulators[next(iter(_accumulators))]
+        _accumulators[key] = ((stat.st_mtime_ns, stat.st_size), weights)
+        return weights
+
+    def add_new_draws(self, columns):
+        """
+        Feed in the draws of a draw_store.DrawColumns (newest first) that are
+        newer than the last one added. Returns False, adding nothing, if the
+        columns don't include that draw.
+        """
+        new = 0
+        while new < len(columns) and (self.last_draw is None or columns.draw_number[new] > self.last_draw):
+            new += 1
+        if self.last_draw is not None and (new == len(columns) or columns.draw_number[new] != self.last_draw):
+            return False
+        for i in range(new - 1, -1, -1):
+            supp = tuple(columns.supp_row(i))
+            self.add_draw(columns.main_row(i), () if 0 in supp else supp,
+                          columns.draw_date[i] or None, columns.draw_number[i])
+        return True
+
+    def add_draw(self, main, supp=(), draw_date=None, draw_number=None):
+        """
+        Add the next draw (newer than every draw added so far).
+        'draw_date' is a yyyymmdd int (see date_number). Returns whether the draw counts.
+        """
+        if draw_number is not None:
+            self.last_draw = draw_number
+        if self.since is not None and (draw_date is None or draw_date < self.since):
+            return False
+        if self.until is not None and (draw_date is None or draw_date > self.until):
+            return False
+
+        if self.decay != 1.0:
+            for weights in (self.main, self.supp):
+                for num in list(weights):
+                    weight = weights[num] * self.decay
+                    if weight > _FORGET:
+                        weights[num] = weight
+                    else:
+                        del weights[num]
+        self._add(self.main, main, 1.0)
+        self._add(self.supp, supp, 1.0)
+        self.draws += 1
+        self.supp_draws += bool(supp)
+
+        if self.window is not None:
+            self.recent.append((tuple(main), tuple(supp)))
+            if len(self.recent) > self.window:
+                # The leaving draw's numbers have decayed once per draw since
+                old_main, old_supp = self.recent.popleft()
+                weight = self.decay ** self.window
+                self._add(self.main, old_main, -weight)
+                self._add(self.supp, old_supp, -weight)
+                self.draws -= 1
+                self.supp_draws -= bool(old_supp)
+        return True
+
+    def _add(self, weights, numbers, delta):
+        for num in numbers:
+            weight = weights.get(num, 0.0) + delta
+            if weight > _FORGET:
+                weights[num] = weight
+            else:
+                weights.pop(num, None)
+
+    def most_common(self, kind="main"):
+        """(number, weight) pairs, heaviest first (ties by number), for "main" or "supp" numbers."""
+        weights = self.main if kind == "main" else self.supp
+        return sorted(weights.items(), key=lambda item: (-item[1], item[0]))